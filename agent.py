@@ -1,236 +1,365 @@
+import asyncio
 import httpx
 from models import TestSuite, TestCase, TestType, Priority, TestStep
-from config import GEMINI_API_KEY
-from typing import List
-import json
+from config import GEMINI_API_KEY, SEMCACHE_PATH
+from gemini_cache import ResponseCache
+from typing import List, Optional, Tuple
+import json_repair
+import logging
+import orjson
 import re
 
+logger = logging.getLogger(__name__)
+
 GEMINI_CHAT_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:streamGenerateContent"
 
-async def generate_test_suite(query: str, context: str) -> TestSuite:
-    prompt = f"""
-    You are an expert test case designer. Using the provided context, generate comprehensive test cases for the user query.
-    
-    Generate AT LEAST 5-8 test cases covering different scenarios and test types:
-    - Generic test cases (high-level, unstructured definitions)
-    - Functional test cases (detailed steps)
-    - Edge cases and boundary conditions
-    - Error handling scenarios
-    - Integration scenarios (if applicable)
-    
-    For GENERIC test cases, provide:
-    1. A descriptive title
-    2. A summary explaining what the test validates
-    3. test_type: "generic"
-    4. Priority (high, medium, low)
-    5. Preconditions (if any)
-    6. An unstructured description (what to test without specific steps)
-    7. Relevant labels
-    
-    For NON-GENERIC test cases, provide:
-    1. A descriptive title
-    2. A summary explaining what the test validates
-    3. test_type: functional|integration|api|ui|performance|security
-    4. Priority (high, medium, low)
-    5. Preconditions (if any)
-    6. Detailed test steps with actions, data, and expected results
-    7. Overall expected result
-    8. Executable test script (when applicable)
-    9. Relevant labels and components
-    
-    IMPORTANT: Return valid JSON without escape sequences. Use simple quotes and avoid special characters that need escaping.
-    
-    Return the result as a JSON object matching this exact schema:
-    {{
-        "query": "{query}",
-        "test_cases": [
-            {{
-                "title": "Descriptive test case title",
-                "summary": "Brief description of what this test validates",
-                "test_type": "generic|functional|integration|api|ui|performance|security",
-                "priority": "high|medium|low",
-                "preconditions": "Setup requirements or null",
-                "description": "Unstructured definition for generic tests or null",
-                "labels": ["label1", "label2"],
-                "steps": [
-                    {{
-                        "action": "Step description",
-                        "data": "Input data as string or JSON object",
-                        "expected_result": "What should happen"
-                    }}
-                ] or null for generic tests,
-                "expected_result": "Overall expected outcome or null for generic tests",
-                "test_script": "Executable script code or null",
-                "components": ["component1", "component2"]
-            }}
+# Shared client so successive Gemini calls reuse the keep-alive pool (and one
+# multiplexed HTTP/2 connection) instead of paying a TCP+TLS handshake per call
+_CLIENT = httpx.AsyncClient(
+    http2=True,
+    headers={"Accept-Encoding": "br, gzip"},
+    timeout=httpx.Timeout(60.0),
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+)
+
+_CACHE = None  # Opened on first use, so importing this module touches no files
+
+def _cache() -> ResponseCache:
+    """The shared semantic response cache (at SEMCACHE_PATH)"""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResponseCache(SEMCACHE_PATH)
+    return _CACHE
+
+# Escape clean-up applied before handing malformed output to json_repair
+_ESCAPE_FIX = re.compile(r'\\\\([^"\\])')
+_STRIP_BAD = re.compile(r'\\[^"\\nrtbfu/]')
+
+async def close_client():
+    """Close the shared Gemini HTTP client (call on application shutdown)"""
+    await _CLIENT.aclose()
+
+# Static instructions travel as the system instruction, separate from the
+# per-call context/query, so every request shares an identical prefix that
+# Gemini's prompt caching can reuse instead of re-encoding it in the user turn
+_SYSTEM_INSTRUCTION = """
+You are an expert test case designer. Using the provided context, generate comprehensive test cases for the user query.
+
+Generate AT LEAST 5-8 test cases covering different scenarios and test types:
+- Generic test cases (high-level, unstructured definitions)
+- Functional test cases (detailed steps)
+- Edge cases and boundary conditions
+- Error handling scenarios
+- Integration scenarios (if applicable)
+
+For GENERIC test cases, provide:
+1. A descriptive title
+2. A summary explaining what the test validates
+3. test_type: "generic"
+4. Priority (high, medium, low)
+5. Preconditions (if any)
+6. An unstructured description (what to test without specific steps)
+7. Relevant labels
+
+For NON-GENERIC test cases, provide:
+1. A descriptive title
+2. A summary explaining what the test validates
+3. test_type: functional|integration|api|ui|performance|security
+4. Priority (high, medium, low)
+5. Preconditions (if any)
+6. Detailed test steps with actions, data, and expected results
+7. Overall expected result
+8. Executable test script (when applicable)
+9. Relevant labels and components
+
+IMPORTANT: Return valid JSON without escape sequences. Use simple quotes and avoid special characters that need escaping.
+
+Return the result as a JSON object matching this exact schema:
+{
+    "query": "The user query, verbatim",
+    "test_cases": [
+        {
+            "title": "Descriptive test case title",
+            "summary": "Brief description of what this test validates",
+            "test_type": "generic|functional|integration|api|ui|performance|security",
+            "priority": "high|medium|low",
+            "preconditions": "Setup requirements or null",
+            "description": "Unstructured definition for generic tests or null",
+            "labels": ["label1", "label2"],
+            "steps": [
+                {
+                    "action": "Step description",
+                    "data": "Input data as string or JSON object",
+                    "expected_result": "What should happen"
+                }
+            ] or null for generic tests,
+            "expected_result": "Overall expected outcome or null for generic tests",
+            "test_script": "Executable script code or null",
+            "components": ["component1", "component2"]
+        }
+    ],
+    "total_count": number_of_test_cases
+}
+"""
+
+# Request pieces that never change: parsed URLs, headers, and the serialized
+# system instruction. Only the prompt text is encoded per call.
+_HEADERS = {"Content-Type": "application/json"}
+_CHAT_URL = httpx.URL(GEMINI_CHAT_URL, params={"key": GEMINI_API_KEY})
+_STREAM_URL = httpx.URL(GEMINI_STREAM_URL, params={"key": GEMINI_API_KEY, "alt": "sse"})
+_BODY_HEAD = b"".join((
+    b'{"systemInstruction":',
+    orjson.dumps({"parts": [{"text": _SYSTEM_INSTRUCTION}]}),
+    b',"contents":[{"parts":[{"text":',
+))
+_BODY_TAIL = b'}]}]}'
+
+# Bytes that can change the brace depth or string state while scanning
+_STRUCTURAL = re.compile(rb'[{}"\\]')
+
+def _extract_json_object(text: str) -> Optional[str]:
+    """Return the first balanced {...} object in text, ignoring braces inside strings"""
+    data = text.encode('utf-8')
+    start = data.find(b'{')
+    if start == -1:
+        return None
+    depth = 0
+    in_string = False
+    escaped_at = -1
+    # Jump between structural bytes only; UTF-8 continuation bytes never match
+    for m in _STRUCTURAL.finditer(data, start):
+        i = m.start()
+        if i == escaped_at:
+            continue
+        c = m.group()
+        if in_string:
+            if c == b'\\':
+                escaped_at = i + 1
+            elif c == b'"':
+                in_string = False
+        elif c == b'"':
+            in_string = True
+        elif c == b'{':
+            depth += 1
+        elif c == b'}':
+            depth -= 1
+            if depth == 0:
+                return data[start:i + 1].decode('utf-8')
+    # Unbalanced (e.g. truncated output): hand everything to the repair path
+    return data[start:].decode('utf-8')
+
+async def _stream_text(body: bytes) -> str:
+    """Collect the candidate text from streamGenerateContent SSE events as they arrive"""
+    parts = []
+    async with _CLIENT.stream("POST", _STREAM_URL, headers=_HEADERS, content=body) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            event = orjson.loads(line[5:])
+            for candidate in event.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    parts.append(part.get("text", ""))
+    return "".join(parts)
+
+# Per-call prompt pieces; only context and query are spliced in at request time
+_PROMPT_HEAD = "\nContext from documentation:\n"
+_PROMPT_MID = "\n\nUser Query: "
+_PROMPT_TAIL = (
+    "\n\nImportant: Generate a mix of generic and detailed test cases. "
+    "Generic test cases should have description but no steps/expected_result.\n"
+)
+
+# Fallback suite validated once at import; "{query}" is filled in per failure
+_FALLBACK_CASES = (
+    TestCase(
+        title="Generic Test Case for: {query}",
+        summary="Basic test case generated as fallback",
+        test_type=TestType.GENERIC,
+        priority=Priority.MEDIUM,
+        preconditions=None,
+        description="Validate the functionality described in the query: {query}. This is a high-level test case that should be refined with specific test scenarios and validation criteria based on the requirements.",
+        labels=["automated", "fallback", "generic"],
+        steps=None,
+        expected_result=None,
+        test_script=None,
+        components=[]
+    ),
+    TestCase(
+        title="Functional Test: {query}",
+        summary="Basic functional validation",
+        test_type=TestType.FUNCTIONAL,
+        priority=Priority.HIGH,
+        preconditions="System is accessible",
+        description=None,
+        labels=["functional", "fallback"],
+        steps=[
+            TestStep(
+                action="Initialize test environment",
+                data="Basic test setup",
+                expected_result="Environment ready"
+            ),
+            TestStep(
+                action="Execute main functionality",
+                data="{query}",
+                expected_result="Functionality works as expected"
+            )
         ],
-        "total_count": number_of_test_cases
-    }}
-    
-    Context from documentation:
-    {context}
-    
-    User Query: {query}
-    
-    Important: Generate a mix of generic and detailed test cases. Generic test cases should have description but no steps/expected_result.
-    """
+        expected_result="Feature functions correctly",
+        test_script="# Basic test\ndef test_functionality():\n    assert True",
+        components=["core"]
+    ),
+    TestCase(
+        title="Error Handling: {query}",
+        summary="Basic error handling validation",
+        test_type=TestType.GENERIC,
+        priority=Priority.MEDIUM,
+        preconditions="System in normal state",
+        description="Test error handling for {query}. Verify system handles invalid inputs and error conditions gracefully.",
+        labels=["error-handling", "fallback"],
+        steps=None,
+        expected_result=None,
+        test_script=None,
+        components=[]
+    ),
+    TestCase(
+        title="Integration Test: {query}",
+        summary="Basic integration testing",
+        test_type=TestType.INTEGRATION,
+        priority=Priority.MEDIUM,
+        preconditions="All components available",
+        description=None,
+        labels=["integration", "fallback"],
+        steps=[
+            TestStep(
+                action="Test component integration",
+                data="{query}",
+                expected_result="Components work together"
+            )
+        ],
+        expected_result="Integration functions correctly",
+        test_script=None,
+        components=["integration"]
+    ),
+    TestCase(
+        title="Security Test: {query}",
+        summary="Basic security validation",
+        test_type=TestType.SECURITY,
+        priority=Priority.MEDIUM,
+        preconditions="Security testing environment",
+        description="Validate security aspects of {query}. Check for vulnerabilities and security compliance.",
+        labels=["security", "fallback"],
+        steps=None,
+        expected_result=None,
+        test_script=None,
+        components=[]
+    )
+)
+
+def _fallback_suite(query: str) -> TestSuite:
+    """Copy the fallback template with the query substituted into its text fields"""
+    def fill(value):
+        return value.replace("{query}", query) if isinstance(value, str) else value
+
+    test_cases = []
+    for tc in _FALLBACK_CASES:
+        steps = None
+        if tc.steps is not None:
+            steps = [step.model_copy(update={"data": fill(step.data)}) for step in tc.steps]
+        test_cases.append(tc.model_copy(update={
+            "title": fill(tc.title),
+            "description": fill(tc.description),
+            "labels": list(tc.labels),
+            "components": list(tc.components),
+            "steps": steps,
+        }))
+    return TestSuite(query=query, test_cases=test_cases, total_count=len(test_cases))
+
+async def generate_test_suite(query: str, context: str,
+                              query_embedding: Optional[List[float]] = None,
+                              no_cache: bool = False) -> TestSuite:
+    if not no_cache:
+        cached = _cache().get(query, context, query_embedding)
+        if cached is not None:
+            logger.info("Cache hit for query: %.80s", query)
+            return cached
+
+    prompt = "".join((_PROMPT_HEAD, context, _PROMPT_MID, query, _PROMPT_TAIL))
     
-    headers = {"Content-Type": "application/json"}
-    params = {"key": GEMINI_API_KEY}
-    data = {
-        "contents": [{"parts": [{"text": prompt}]}]
-    }
+    body = b"".join((_BODY_HEAD, orjson.dumps(prompt), _BODY_TAIL))
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(GEMINI_CHAT_URL, headers=headers, params=params, json=data)
+    try:
+        text = await _stream_text(body)
+        result = text
+    # HTTPError covers transport failures and error statuses as well as stream errors
+    except (httpx.HTTPError, orjson.JSONDecodeError, KeyError, TypeError) as e:
+        logger.warning("Streaming response failed, retrying without streaming: %s", e)
+        text = None
+
+    if text is None:
+        resp = await _CLIENT.post(_CHAT_URL, headers=_HEADERS, content=body)
         resp.raise_for_status()
         result = resp.json()
+
+    try:
+        if text is None:
+            text = result["candidates"][0]["content"]["parts"][0]["text"]
+        logger.debug("Raw LLM response: %.200s", text)
         
+        # Clean the response - remove markdown code blocks if present
+        text = text.strip()
+        if text.startswith("```json"):
+            text = text[7:]
+        if text.startswith("```"):
+            text = text[3:]
+        if text.endswith("```"):
+            text = text[:-3]
+        
+        # Extract the first balanced JSON object from the response
+        json_str = _extract_json_object(text)
+        if json_str is None:
+            raise ValueError("No JSON found in response")
+        
+        logger.debug("Extracted JSON: %.300s", json_str)
+        
+        # Fast path: orjson parses well-formed output directly
         try:
-            text = result["candidates"][0]["content"]["parts"][0]["text"]
-            print(f"🤖 Raw LLM Response: {text[:200]}...")
-            
-            # Clean the response - remove markdown code blocks if present
-            text = text.strip()
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
-            
-            # Extract JSON from the response
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start == -1 or end == 0:
-                raise ValueError("No JSON found in response")
-                
-            json_str = text[start:end]
-            print(f"📄 Extracted JSON: {json_str[:300]}...")
-            
-            # Try to fix common JSON escape issues
-            try:
-                parsed_data = json.loads(json_str)
-            except json.JSONDecodeError as json_error:
-                print(f"⚠️  JSON decode error: {json_error}")
-                print("🔧 Attempting to fix JSON escape issues...")
-                
-                # Fix common escape sequence issues
-                fixed_json = json_str.replace('\\{', '{').replace('\\}', '}').replace('\\"', '"')
-                # Fix escaped backslashes in paths
-                import re
-                fixed_json = re.sub(r'\\\\([^"\\])', r'\\\1', fixed_json)
-                
-                try:
-                    parsed_data = json.loads(fixed_json)
-                    print("✅ Fixed JSON parsing issues")
-                except json.JSONDecodeError as second_error:
-                    print(f"❌ Still cannot parse JSON: {second_error}")
-                    # Try one more fix - remove problematic escape sequences
-                    very_fixed_json = re.sub(r'\\[^"\\nrtbf/]', '', fixed_json)
-                    parsed_data = json.loads(very_fixed_json)
-                    print("✅ Applied aggressive JSON fixes")
-            
-            # Ensure we have the total_count field
-            if "total_count" not in parsed_data:
-                parsed_data["total_count"] = len(parsed_data.get("test_cases", []))
-            
-            obj = TestSuite(**parsed_data)
-            print(f"✅ Generated {len(obj.test_cases)} test cases")
-            return obj
-            
-        except Exception as e:
-            print(f"❌ Error parsing LLM response: {e}")
-            print(f"🔍 Raw response: {result}")
-            
-            # Fallback: Create multiple basic test cases
-            fallback_tests = [
-                TestCase(
-                    title=f"Generic Test Case for: {query}",
-                    summary="Basic test case generated as fallback",
-                    test_type=TestType.GENERIC,
-                    priority=Priority.MEDIUM,
-                    preconditions=None,
-                    description=f"Validate the functionality described in the query: {query}. This is a high-level test case that should be refined with specific test scenarios and validation criteria based on the requirements.",
-                    labels=["automated", "fallback", "generic"],
-                    steps=None,
-                    expected_result=None,
-                    test_script=None,
-                    components=[]
-                ),
-                TestCase(
-                    title=f"Functional Test: {query}",
-                    summary="Basic functional validation",
-                    test_type=TestType.FUNCTIONAL,
-                    priority=Priority.HIGH,
-                    preconditions="System is accessible",
-                    description=None,
-                    labels=["functional", "fallback"],
-                    steps=[
-                        TestStep(
-                            action="Initialize test environment",
-                            data="Basic test setup",
-                            expected_result="Environment ready"
-                        ),
-                        TestStep(
-                            action="Execute main functionality",
-                            data=query,
-                            expected_result="Functionality works as expected"
-                        )
-                    ],
-                    expected_result="Feature functions correctly",
-                    test_script="# Basic test\ndef test_functionality():\n    assert True",
-                    components=["core"]
-                ),
-                TestCase(
-                    title=f"Error Handling: {query}",
-                    summary="Basic error handling validation",
-                    test_type=TestType.GENERIC,
-                    priority=Priority.MEDIUM,
-                    preconditions="System in normal state",
-                    description=f"Test error handling for {query}. Verify system handles invalid inputs and error conditions gracefully.",
-                    labels=["error-handling", "fallback"],
-                    steps=None,
-                    expected_result=None,
-                    test_script=None,
-                    components=[]
-                ),
-                TestCase(
-                    title=f"Integration Test: {query}",
-                    summary="Basic integration testing",
-                    test_type=TestType.INTEGRATION,
-                    priority=Priority.MEDIUM,
-                    preconditions="All components available",
-                    description=None,
-                    labels=["integration", "fallback"],
-                    steps=[
-                        TestStep(
-                            action="Test component integration",
-                            data=query,
-                            expected_result="Components work together"
-                        )
-                    ],
-                    expected_result="Integration functions correctly",
-                    test_script=None,
-                    components=["integration"]
-                ),
-                TestCase(
-                    title=f"Security Test: {query}",
-                    summary="Basic security validation",
-                    test_type=TestType.SECURITY,
-                    priority=Priority.MEDIUM,
-                    preconditions="Security testing environment",
-                    description=f"Validate security aspects of {query}. Check for vulnerabilities and security compliance.",
-                    labels=["security", "fallback"],
-                    steps=None,
-                    expected_result=None,
-                    test_script=None,
-                    components=[]
-                )
-            ]
-            
-            return TestSuite(
-                query=query,
-                test_cases=fallback_tests,
-                total_count=len(fallback_tests)
-            )
+            parsed_data = orjson.loads(json_str)
+        except orjson.JSONDecodeError as json_error:
+            logger.warning("JSON decode error, attempting repair: %s", json_error)
+            fixed_json = json_str.replace('\\{', '{').replace('\\}', '}')
+            fixed_json = _ESCAPE_FIX.sub(r'\\\1', fixed_json)
+            fixed_json = _STRIP_BAD.sub('', fixed_json)
+            parsed_data = json_repair.loads(fixed_json)
+            if not isinstance(parsed_data, dict):
+                raise ValueError("Repaired JSON is not an object")
+            logger.info("Repaired malformed JSON response")
+        
+        # Ensure we have the total_count field
+        if "total_count" not in parsed_data:
+            parsed_data["total_count"] = len(parsed_data.get("test_cases", []))
+        
+        obj = TestSuite(**parsed_data)
+        logger.info("Generated %d test cases", len(obj.test_cases))
+        if not no_cache:
+            _cache().put(query, context, obj, query_embedding)
+        return obj
+        
+    except Exception as e:
+        logger.error("Error parsing LLM response: %s", e)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Raw response: %r", result)
+        
+        # Fallback: Create multiple basic test cases
+        return _fallback_suite(query)
+
+async def generate_test_suites(pairs: List[Tuple[str, str]], concurrency: int = 8) -> List[TestSuite]:
+    """Generate suites for many (query, context) pairs concurrently, preserving input order"""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one(query: str, context: str) -> TestSuite:
+        async with sem:
+            return await generate_test_suite(query, context)
+
+    return await asyncio.gather(*[_one(q, c) for q, c in pairs])
@@ -0,0 +1,30 @@
+"""
+Stable chunk identifiers
+The one content hash of chunk text, shared by ingestion, Qdrant payloads and
+Neo4j nodes, and the deterministic chunk ids used as Qdrant point ids and
+Neo4j chunk_id keys (kept free of config/client imports so every module can use it)
+"""
+import uuid
+from typing import Dict
+import xxhash
+
+# Namespace of the UUIDv5 chunk ids: the same name always gives the same id
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "graphrag-agent/chunk")
+
+def text_hash(text: str) -> str:
+    """Content hash of a chunk's text, used to find chunks that are already embedded or duplicated"""
+    return xxhash.xxh64(text.encode('utf-8')).hexdigest()
+
+def chunk_uuid(file_name: str, section, index) -> str:
+    """Deterministic id of the index-th chunk of a section of a file
+
+    Re-ingesting a file rewrites the same points/nodes, and chunks of other
+    files can never collide with them.
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{file_name}/{section}/{index}"))
+
+def assign_chunk_id(chunk: Dict) -> str:
+    """The chunk's id, derived from its file, section title and text if it has none yet"""
+    if 'chunk_id' not in chunk:
+        chunk['chunk_id'] = chunk_uuid(chunk['file_name'], chunk.get('section_title'), text_hash(chunk['text']))
+    return chunk['chunk_id']
@@ -5,12 +5,41 @@ Checks for and removes duplicate entries in Neo4j and Qdrant
 """
 import sys
 from typing import Dict, List
-from integrated_graphrag import IntegratedGraphRAG
+from chunk_ids import text_hash
+
+def backfill_text_hashes(session, vector_store) -> int:
+    """Set text_hash on chunks ingested before the hash was stored (or under text_sha1)
+    
+    Hashed in Python, so APOC is not needed. The text comes from the node when
+    an older ingestion stored it there, otherwise from the chunk's Qdrant payload.
+    """
+    records = session.run("""
+        MATCH (c:Chunk) WHERE c.text_hash IS NULL
+        RETURN c.chunk_id as chunk_id, c.text as text
+    """).data()
+    missing = [record['chunk_id'] for record in records if record['text'] is None]
+    payloads = vector_store.get_chunks_bulk(missing)
+    rows = []
+    for record in records:
+        text = record['text']
+        if text is None:
+            text = payloads.get(record['chunk_id'], {}).get('text')
+        if text is not None:
+            rows.append({'chunk_id': record['chunk_id'],
+                         'text_hash': text_hash(text)})
+    if rows:
+        session.run("""
+            UNWIND $rows AS row
+            MATCH (c:Chunk {chunk_id: row.chunk_id})
+            SET c.text_hash = row.text_hash
+        """, rows=rows).consume()
+    return len(rows)
 
 def check_duplicates():
     """Check for duplicate entries in the system"""
     try:
         print("🔍 Checking for duplicate entries...")
+        from integrated_graphrag import IntegratedGraphRAG
         graph = IntegratedGraphRAG()
         
         # Check Neo4j for duplicate chunks
@@ -19,11 +48,12 @@ def check_duplicates():
             # Count total chunks
             result = session.run("MATCH (c:Chunk) RETURN count(c) as total")
             total_chunks = result.single()['total']
+            backfill_text_hashes(session, graph.qdrant_vector)
             
-            # Count unique chunks by text hash
+            # Count unique chunks by text hash (chunks whose text couldn't be found are left out)
             result = session.run("""
-                MATCH (c:Chunk) 
-                WITH c.text as text, count(c) as count_per_text
+                MATCH (c:Chunk) WHERE c.text_hash IS NOT NULL
+                WITH c.text_hash as text_hash, count(c) as count_per_text
                 RETURN count_per_text, count(*) as frequency
                 ORDER BY count_per_text DESC
             """)
@@ -45,13 +75,11 @@ def check_duplicates():
         if collection_info:
             print(f"📊 Total points: {collection_info.points_count}")
             
-            # In a real scenario, we'd need to check vector similarity
-            # For now, just report the count
-            if collection_info.points_count > 600:  # Expected ~559
-                print(f"⚠️  Suspiciously high point count: {collection_info.points_count}")
-                print("💡 This might indicate duplicates")
+            duplicate_ids = graph.qdrant_vector.find_duplicate_points()
+            if duplicate_ids:
+                print(f"⚠️  Found {len(duplicate_ids)} near-identical vectors (--cleanup removes these chunks from both stores)")
             else:
-                print("✅ Point count looks normal")
+                print("✅ No duplicate vectors found in Qdrant")
         
         return {'neo4j_chunks': total_chunks, 'qdrant_points': collection_info.points_count if collection_info else 0}
         
@@ -70,25 +98,23 @@ def cleanup_duplicates():
         return
     
     try:
+        from integrated_graphrag import IntegratedGraphRAG
         graph = IntegratedGraphRAG()
         
-        print("🗑️  Removing duplicate chunks from Neo4j...")
-        with graph.neo4j_graph.driver.session() as session:
-            # Remove duplicate chunks (keep first occurrence)
-            result = session.run("""
-                MATCH (c:Chunk)
-                WITH c.text as text, collect(c) as chunks
-                WHERE size(chunks) > 1
-                UNWIND chunks[1..] as duplicate
-                DETACH DELETE duplicate
-                RETURN count(*) as deleted
-            """)
-            deleted = result.single()['deleted']
-            print(f"✅ Deleted {deleted} duplicate chunks from Neo4j")
+        # Duplicates are picked once, from Qdrant's vectors; point ids are the
+        # chunk_ids, so deleting the same ids from both stores keeps every
+        # surviving graph node backed by its payload (and vice versa)
+        print("🔍 Finding near-identical chunks...")
+        duplicate_ids = graph.qdrant_vector.find_duplicate_points()
+        if not duplicate_ids:
+            print("✅ No duplicate chunks found")
+            return
         
-        # For Qdrant, we'd need to implement vector similarity checking
-        # This is more complex and requires careful analysis
-        print("💡 Qdrant cleanup requires manual review of vector similarities")
+        if graph.neo4j_graph:
+            print(f"🗑️  Removing {len(duplicate_ids)} duplicate chunks from Neo4j...")
+            graph.neo4j_graph.delete_chunks(duplicate_ids)
+        print(f"🗑️  Removing {len(duplicate_ids)} duplicate chunks from Qdrant...")
+        graph.qdrant_vector.delete_points(duplicate_ids)
         
     except Exception as e:
         print(f"❌ Cleanup failed: {e}")
@@ -1,38 +1,112 @@
 import os
+from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
 
-# Force reload environment variables (important for switching configurations)
-load_dotenv(override=True)
+@dataclass(frozen=True)
+class Config:
+    __slots__ = (
+        "gemini_api_key", "neo4j_uri", "neo4j_username", "neo4j_password",
+        "neo4j_database", "neo4j_mode", "qdrant_url", "qdrant_api_key",
+        "qdrant_host", "qdrant_port", "qdrant_grpc_port", "qdrant_prefer_grpc",
+        "qdrant_collection_name", "qdrant_mode",
+        "ingest_batch", "hnsw_m", "hnsw_ef_construct", "hnsw_ef", "semcache_path",
+    )
+    gemini_api_key: Optional[str]
+    neo4j_uri: Optional[str]
+    neo4j_username: Optional[str]
+    neo4j_password: Optional[str]
+    neo4j_database: str
+    neo4j_mode: str
+    qdrant_url: Optional[str]
+    qdrant_api_key: Optional[str]
+    qdrant_host: str
+    qdrant_port: int
+    qdrant_grpc_port: int
+    qdrant_prefer_grpc: bool
+    qdrant_collection_name: str
+    qdrant_mode: str
+    ingest_batch: int
+    hnsw_m: int
+    hnsw_ef_construct: int
+    hnsw_ef: int
+    semcache_path: str
 
-# Gemini API configuration
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+_CFG = None
 
-# Neo4j configuration - supports both Desktop and Aura
-NEO4J_URI = os.getenv("NEO4J_URI")
-NEO4J_USERNAME = os.getenv("NEO4J_USERNAME")
-NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
-NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+def load_config() -> Config:
+    """Read .env once and return the shared configuration"""
+    global _CFG
+    if _CFG is not None:
+        return _CFG
 
-# Determine Neo4j mode
-NEO4J_MODE = "aura" if NEO4J_URI and "neo4j+s://" in NEO4J_URI else "desktop"
+    # Force reload environment variables (important for switching configurations)
+    load_dotenv(override=True)
 
-# Qdrant configuration - supports both Docker and Cloud
-QDRANT_URL = os.getenv("QDRANT_URL")  # For Qdrant Cloud
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")  # For Qdrant Cloud
-QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")  # For Docker
-QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))  # For Docker
-QDRANT_COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME", "document_chunks")
+    neo4j_uri = os.getenv("NEO4J_URI")
+    qdrant_url = os.getenv("QDRANT_URL")  # For Qdrant Cloud
+    _CFG = Config(
+        gemini_api_key=os.getenv("GEMINI_API_KEY"),
+        # Neo4j configuration - supports both Desktop and Aura
+        neo4j_uri=neo4j_uri,
+        neo4j_username=os.getenv("NEO4J_USERNAME"),
+        neo4j_password=os.getenv("NEO4J_PASSWORD"),
+        neo4j_database=os.getenv("NEO4J_DATABASE", "neo4j"),
+        neo4j_mode="aura" if neo4j_uri and "neo4j+s://" in neo4j_uri else "desktop",
+        # Qdrant configuration - supports both Docker and Cloud
+        qdrant_url=qdrant_url,
+        qdrant_api_key=os.getenv("QDRANT_API_KEY"),  # For Qdrant Cloud
+        qdrant_host=os.getenv("QDRANT_HOST", "localhost"),  # For Docker
+        qdrant_port=int(os.getenv("QDRANT_PORT", "6333")),  # For Docker
+        # gRPC transport (faster for bulk upserts); set QDRANT_PREFER_GRPC=false for REST only
+        qdrant_grpc_port=int(os.getenv("QDRANT_GRPC_PORT", "6334")),
+        qdrant_prefer_grpc=os.getenv("QDRANT_PREFER_GRPC", "true").lower() in ("1", "true", "yes"),
+        qdrant_collection_name=os.getenv("QDRANT_COLLECTION_NAME", "document_chunks"),
+        qdrant_mode="cloud" if qdrant_url else "docker",
+        # Chunks per Neo4j/Qdrant write during ingestion
+        ingest_batch=int(os.getenv("INGEST_BATCH", "256")),
+        # Qdrant HNSW graph degree, build-time and search-time beam widths
+        hnsw_m=int(os.getenv("HNSW_M", "24")),
+        hnsw_ef_construct=int(os.getenv("HNSW_EFC", "200")),
+        hnsw_ef=int(os.getenv("HNSW_EFS", "100")),
+        # SQLite file of the semantic response cache (see gemini_cache)
+        semcache_path=os.getenv("SEMCACHE_PATH", "semcache.db"),
+    )
+    return _CFG
 
-# Determine Qdrant mode
-QDRANT_MODE = "cloud" if QDRANT_URL else "docker"
+CFG = load_config()
+
+# Module-level names kept for existing imports
+GEMINI_API_KEY = CFG.gemini_api_key
+NEO4J_URI = CFG.neo4j_uri
+NEO4J_USERNAME = CFG.neo4j_username
+NEO4J_PASSWORD = CFG.neo4j_password
+NEO4J_DATABASE = CFG.neo4j_database
+NEO4J_MODE = CFG.neo4j_mode
+QDRANT_URL = CFG.qdrant_url
+QDRANT_API_KEY = CFG.qdrant_api_key
+QDRANT_HOST = CFG.qdrant_host
+QDRANT_PORT = CFG.qdrant_port
+QDRANT_GRPC_PORT = CFG.qdrant_grpc_port
+QDRANT_PREFER_GRPC = CFG.qdrant_prefer_grpc
+QDRANT_COLLECTION_NAME = CFG.qdrant_collection_name
+QDRANT_MODE = CFG.qdrant_mode
+INGEST_BATCH = CFG.ingest_batch
+HNSW_M = CFG.hnsw_m
+HNSW_EF_CONSTRUCT = CFG.hnsw_ef_construct
+HNSW_EF = CFG.hnsw_ef
+SEMCACHE_PATH = CFG.semcache_path
+
+VERBOSE = bool(os.getenv("GRAPHRAG_VERBOSE"))
 
 # Debug: Print what we're loading (helpful for troubleshooting)
-print(f"🔍 Debug - Loading configuration from .env:")
-print(f"   GEMINI_API_KEY found: {'Yes' if GEMINI_API_KEY else 'No'}")
-if GEMINI_API_KEY:
-    print(f"   GEMINI_API_KEY preview: {GEMINI_API_KEY[:10]}...")
-print(f"   NEO4J_URI: {NEO4J_URI}")
-print(f"   QDRANT_URL: {QDRANT_URL}")
+if VERBOSE:
+    print(f"🔍 Debug - Loading configuration from .env:")
+    print(f"   GEMINI_API_KEY found: {'Yes' if GEMINI_API_KEY else 'No'}")
+    if GEMINI_API_KEY:
+        print(f"   GEMINI_API_KEY preview: {GEMINI_API_KEY[:10]}...")
+    print(f"   NEO4J_URI: {NEO4J_URI}")
+    print(f"   QDRANT_URL: {QDRANT_URL}")
 
 # Assertions with better error messages
 if not GEMINI_API_KEY:
@@ -43,17 +117,18 @@ if not GEMINI_API_KEY:
     raise AssertionError("Missing GEMINI_API_KEY environment variable!")
 
 # Neo4j is optional - system will fallback to in-memory if not available
-print(f"📋 Configuration loaded:")
-print(f"   Gemini API: {'✅' if GEMINI_API_KEY else '❌'}")
-if NEO4J_URI:
-    if NEO4J_MODE == "aura":
-        print(f"   Neo4j: ☁️ Aura mode ({NEO4J_URI})")
+if VERBOSE:
+    print(f"📋 Configuration loaded:")
+    print(f"   Gemini API: {'✅' if GEMINI_API_KEY else '❌'}")
+    if NEO4J_URI:
+        if NEO4J_MODE == "aura":
+            print(f"   Neo4j: ☁️ Aura mode ({NEO4J_URI})")
+        else:
+            print(f"   Neo4j: 🖥️ Desktop mode ({NEO4J_URI})")
+    else:
+        print(f"   Neo4j: ❌ (will use in-memory fallback)")
+
+    if QDRANT_MODE == "cloud":
+        print(f"   Qdrant: ☁️ Cloud mode ({QDRANT_URL})")
     else:
-        print(f"   Neo4j: 🖥️ Desktop mode ({NEO4J_URI})")
-else:
-    print(f"   Neo4j: ❌ (will use in-memory fallback)")
-
-if QDRANT_MODE == "cloud":
-    print(f"   Qdrant: ☁️ Cloud mode ({QDRANT_URL})")
-else:
-    print(f"   Qdrant: 🐳 Docker mode ({QDRANT_HOST}:{QDRANT_PORT})")
\ No newline at end of file
+        print(f"   Qdrant: 🐳 Docker mode ({QDRANT_HOST}:{QDRANT_PORT})")
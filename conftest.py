@@ -0,0 +1,21 @@
+"""
+Shared pytest fixtures
+Session-scoped so the documents folder and section tracker are set up once per run
+"""
+import os
+import pytest
+from section_tracker import SectionTracker
+
+@pytest.fixture(scope="session")
+def doc_folder() -> str:
+    """The repository's sample documents folder (tests are skipped without it)"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents")
+    if not os.path.isdir(folder):
+        pytest.skip(f"Document folder '{folder}' not found")
+    return folder
+
+@pytest.fixture(scope="session")
+def tracker(tmp_path_factory) -> SectionTracker:
+    """A SectionTracker whose cache lives in a temporary folder, so tests never
+    reset or rewrite the working copy's section_cache.msgpack"""
+    return SectionTracker(str(tmp_path_factory.mktemp("section_cache") / "section_cache.msgpack"))
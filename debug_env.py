@@ -21,16 +21,11 @@ def check_env_file():
     
     print("✅ .env file found")
     
-    # Read and check contents
-    with open(env_path, 'r') as f:
-        content = f.read()
-    
-    # Check for GEMINI_API_KEY
-    if "GEMINI_API_KEY=" in content:
-        # Extract the line
-        for line in content.split('\n'):
+    # Scan the file line by line for GEMINI_API_KEY
+    with open(env_path, 'r', errors='replace') as f:
+        for line in f:
             if line.startswith('GEMINI_API_KEY='):
-                value = line.split('=', 1)[1]
+                value = line.rstrip('\r\n').split('=', 1)[1]
                 if value and value != "your-gemini-api-key-here":
                     print(f"✅ GEMINI_API_KEY found in .env file: {value[:10]}...")
                     return True
@@ -38,9 +33,9 @@ def check_env_file():
                     print("❌ GEMINI_API_KEY is empty or placeholder")
                     print("💡 Update .env with your real Gemini API key")
                     return False
-    else:
-        print("❌ GEMINI_API_KEY not found in .env file")
-        return False
+    
+    print("❌ GEMINI_API_KEY not found in .env file")
+    return False
 
 def test_dotenv_loading():
     """Test if dotenv can load the environment"""
@@ -93,19 +88,17 @@ def test_manual_loading():
     
     try:
         # Read .env manually
-        with open('.env', 'r') as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            line = line.strip()
-            if line.startswith('GEMINI_API_KEY=') and not line.startswith('#'):
-                value = line.split('=', 1)[1]
-                print(f"✅ Found in file: GEMINI_API_KEY={value[:10]}...")
-                
-                # Set manually
-                os.environ['GEMINI_API_KEY'] = value
-                print(f"✅ Set manually: {os.getenv('GEMINI_API_KEY')[:10]}...")
-                return True
+        with open('.env', 'r', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith('GEMINI_API_KEY=') and not line.startswith('#'):
+                    value = line.split('=', 1)[1]
+                    print(f"✅ Found in file: GEMINI_API_KEY={value[:10]}...")
+                    
+                    # Set manually
+                    os.environ['GEMINI_API_KEY'] = value
+                    print(f"✅ Set manually: {os.getenv('GEMINI_API_KEY')[:10]}...")
+                    return True
         
         print("❌ GEMINI_API_KEY not found or commented out")
         return False
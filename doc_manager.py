@@ -5,7 +5,6 @@ Allows force reprocessing and cache management
 """
 import sys
 import argparse
-from document_tracker import DocumentTracker
 
 def main():
     parser = argparse.ArgumentParser(description="GraphRAG Document Management CLI")
@@ -18,6 +17,8 @@ def main():
     
     args = parser.parse_args()
     
+    # Deferred so --help and argument errors return without loading the tracker
+    from document_tracker import DocumentTracker
     tracker = DocumentTracker()
     
     if args.clear_cache:
@@ -3,54 +3,164 @@ Document Change Tracking System
 Prevents unnecessary re-processing of unchanged documents
 """
 import os
-import json
-import hashlib
-from typing import Dict, List, Set
+import msgpack
+import orjson
+import xxhash
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+HASH_BLOCK_SIZE = 1 << 20  # 1 MiB
+COMPACT_RATIO = 4  # Rewrite the snapshot once the log outgrows it this many times
+
 class DocumentTracker:
     """Tracks document changes to avoid unnecessary re-processing"""
     
-    def __init__(self, cache_file: str = "document_cache.json"):
+    def __init__(self, cache_file: str = "document_cache.msgpack"):
         self.cache_file = cache_file
+        # Changes are appended to a log next to the snapshot; the snapshot is
+        # only rewritten (compacted) when the log grows large or on a reset
+        self.log_file = cache_file + ".log"
+        self._dirty = False  # snapshot needs a full rewrite
+        self._log_records: List[Dict] = []  # changes not yet appended to the log
         self.cache = self._load_cache()
+        self._loaded_stamp = self._cache_stamp()
+        # Metadata (size, mtime, hash) gathered by get_changed_documents, reused
+        # by mark_documents_processed so files are not hashed twice
+        self._pending_metadata: Dict[str, Dict] = {}
+    
+    def _cache_stamp(self) -> Tuple:
+        """(mtime_ns, size) of the snapshot and log, to detect writes by other processes"""
+        stamp = []
+        for path in (self.cache_file, self.log_file):
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def is_stale(self) -> bool:
+        """True if the cache files changed on disk since this tracker last read or wrote them"""
+        return self._cache_stamp() != self._loaded_stamp
     
     def _load_cache(self) -> Dict:
-        """Load cached document metadata"""
+        """Load cached document metadata: snapshot first, then replay the log"""
+        cache = self._load_snapshot()
+        if os.path.exists(self.log_file):
+            try:
+                with open(self.log_file, 'rb') as f:
+                    for line in f:
+                        try:
+                            record = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            continue  # torn write from an interrupted run
+                        if record["action"] == "delete":
+                            cache["documents"].pop(record["filename"], None)
+                        else:
+                            cache["documents"][record["filename"]] = record["metadata"]
+                        cache["last_updated"] = record.get("last_updated", cache.get("last_updated"))
+            except Exception as e:
+                print(f"⚠️  Warning: Could not replay document cache log: {e}")
+        return cache
+    
+    def _load_snapshot(self) -> Dict:
+        """Load the compacted cache snapshot"""
         if os.path.exists(self.cache_file):
             try:
-                with open(self.cache_file, 'r') as f:
-                    return json.load(f)
+                with open(self.cache_file, 'rb') as f:
+                    return msgpack.unpackb(f.read(), raw=False)
             except Exception as e:
                 print(f"⚠️  Warning: Could not load document cache: {e}")
+        # Migrate a cache left by the older JSON format
+        legacy_file = os.path.splitext(self.cache_file)[0] + ".json"
+        if legacy_file != self.cache_file and os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, 'rb') as f:
+                    cache = orjson.loads(f.read())
+                self._dirty = True  # persist in the new format on next save
+                return cache
+            except Exception as e:
+                print(f"⚠️  Warning: Could not load legacy document cache: {e}")
         return {"documents": {}, "last_updated": None}
     
     def _save_cache(self):
-        """Save document metadata to cache"""
+        """Persist pending changes: append them to the log, compacting when it grows large"""
+        if self._dirty:
+            self.compact()
+            return
+        if not self._log_records:
+            return
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+            self._append_records(self._log_records)
+            self._log_records = []
+            self._loaded_stamp = self._cache_stamp()
+        except Exception as e:
+            print(f"⚠️  Warning: Could not save document cache: {e}")
+            return
+        try:
+            snapshot_size = os.path.getsize(self.cache_file) if os.path.exists(self.cache_file) else 0
+            if os.path.getsize(self.log_file) > COMPACT_RATIO * snapshot_size:
+                self.compact()
+        except OSError:
+            pass
+    
+    def _append_records(self, records: List[Dict]):
+        """Append one orjson line per change record to the cache log"""
+        last_updated = self.cache.get("last_updated")
+        with open(self.log_file, 'ab') as f:
+            f.write(b"".join(
+                orjson.dumps(dict(record, last_updated=last_updated)) + b"\n" for record in records
+            ))
+    
+    def compact(self):
+        """Rewrite the snapshot from the in-memory cache and truncate the log"""
+        try:
+            with open(self.cache_file, 'wb') as f:
+                f.write(msgpack.packb(self.cache))
+            if os.path.exists(self.log_file):
+                os.remove(self.log_file)
+            self._dirty = False
+            self._log_records = []
+            self._loaded_stamp = self._cache_stamp()
         except Exception as e:
             print(f"⚠️  Warning: Could not save document cache: {e}")
     
     def _get_file_hash(self, filepath: str) -> str:
         """Calculate file hash for change detection"""
         try:
+            h = xxhash.xxh3_64()
             with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                    h.update(block)
+            return h.hexdigest()
         except Exception:
             return ""
     
-    def _get_file_metadata(self, filepath: str) -> Dict:
+    @staticmethod
+    def _get_fast_metadata(stat: os.stat_result) -> Dict:
+        """Cheap change-detection metadata (size, modified time) from a stat result"""
+        return {"size": stat.st_size, "modified": stat.st_mtime}
+    
+    @staticmethod
+    def _fast_metadata_matches(cached: Dict, fast: Dict) -> bool:
+        """Same size and mtime as the cached entry: treat the file as unchanged"""
+        return bool(cached) and cached.get("size") == fast["size"] and cached.get("modified") == fast["modified"]
+    
+    def _get_full_metadata(self, filepath: str, stat: os.stat_result = None) -> Dict:
         """Get file metadata (size, modified time, hash)"""
         try:
-            stat = os.stat(filepath)
-            return {
-                "size": stat.st_size,
-                "modified": stat.st_mtime,
-                "hash": self._get_file_hash(filepath),
-                "last_processed": datetime.now().isoformat()
-            }
+            if stat is None:
+                stat = os.stat(filepath)
+            metadata = self._get_fast_metadata(stat)
+            # Size and mtime unchanged since last time: reuse the cached hash
+            cached = self.cache["documents"].get(os.path.basename(filepath), {})
+            if cached.get("hash") and self._fast_metadata_matches(cached, metadata):
+                metadata["hash"] = cached["hash"]
+            else:
+                metadata["hash"] = self._get_file_hash(filepath)
+            metadata["last_processed"] = datetime.now().isoformat()
+            return metadata
         except Exception:
             return {}
     
@@ -66,28 +176,48 @@ class DocumentTracker:
             return changed_docs
         
         current_files = set()
+        to_hash = []
+        
+        # Check all .docx files in the folder; scandir entries carry their stat
+        with os.scandir(doc_folder) as it:
+            entries = [e for e in it if e.name.endswith(".docx") and e.is_file()]
         
-        # Check all .docx files in the folder
-        for filename in os.listdir(doc_folder):
-            if filename.endswith(".docx"):
-                filepath = os.path.join(doc_folder, filename)
-                current_files.add(filename)
-                
-                current_metadata = self._get_file_metadata(filepath)
-                cached_metadata = self.cache["documents"].get(filename, {})
-                
-                # Check if file is new or modified
+        for entry in entries:
+            current_files.add(entry.name)
+            cached_metadata = self.cache["documents"].get(entry.name, {})
+            
+            # Same size and mtime as last processing: skip hashing entirely
+            fast = self._get_fast_metadata(entry.stat())
+            if self._fast_metadata_matches(cached_metadata, fast):
+                changed_docs["unchanged"].append(entry.path)
+                print(f"✅ Unchanged document: {entry.name}")
+            else:
+                to_hash.append((entry, fast, cached_metadata))
+        
+        # Hash new and changed candidates concurrently (I/O releases the GIL)
+        if to_hash:
+            candidates = [entry.path for entry, _, _ in to_hash]
+            if len(candidates) == 1:
+                hashes = [self._get_file_hash(candidates[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(8, len(candidates))) as pool:
+                    hashes = list(pool.map(self._get_file_hash, candidates))
+            for (entry, fast, cached_metadata), file_hash in zip(to_hash, hashes):
+                metadata = dict(fast, hash=file_hash)
                 if not cached_metadata:
-                    changed_docs["new"].append(filepath)
-                    print(f"📄 New document: {filename}")
-                elif (current_metadata.get("hash") != cached_metadata.get("hash") or
-                      current_metadata.get("size") != cached_metadata.get("size") or
-                      current_metadata.get("modified") != cached_metadata.get("modified")):
-                    changed_docs["modified"].append(filepath)
-                    print(f"🔄 Modified document: {filename}")
+                    changed_docs["new"].append(entry.path)
+                    self._pending_metadata[entry.name] = metadata
+                    print(f"📄 New document: {entry.name}")
+                elif file_hash and file_hash == cached_metadata.get("hash"):
+                    # Touched but identical content: refresh stat so it short-circuits next time
+                    cached_metadata.update(fast)
+                    self._log_records.append({"filename": entry.name, "action": "put", "metadata": cached_metadata})
+                    changed_docs["unchanged"].append(entry.path)
+                    print(f"✅ Unchanged document: {entry.name}")
                 else:
-                    changed_docs["unchanged"].append(filepath)
-                    print(f"✅ Unchanged document: {filename}")
+                    changed_docs["modified"].append(entry.path)
+                    self._pending_metadata[entry.name] = metadata
+                    print(f"🔄 Modified document: {entry.name}")
         
         # Check for deleted files
         deleted_files = set(self.cache["documents"].keys()) - current_files
@@ -95,28 +225,57 @@ class DocumentTracker:
             print(f"🗑️  Deleted documents: {', '.join(deleted_files)}")
             for filename in deleted_files:
                 del self.cache["documents"][filename]
+                self._log_records.append({"filename": filename, "action": "delete"})
         
         return changed_docs
     
     def mark_documents_processed(self, doc_folder: str, processed_files: List[str] = None):
         """Mark documents as processed and update cache"""
         if processed_files is None:
-            # Mark all .docx files in folder as processed
-            processed_files = [f for f in os.listdir(doc_folder) if f.endswith(".docx")]
+            # Mark all .docx files in folder as processed, reusing scandir's stat
+            with os.scandir(doc_folder) as it:
+                entries = [e for e in it if e.name.endswith(".docx") and e.is_file()]
+            processed_files = [entry.name for entry in entries]
+            for entry in entries:
+                self._record_processed(entry.name, entry.path, entry.stat())
+        else:
+            for filename in processed_files:
+                if filename.endswith(".docx"):
+                    filepath = os.path.join(doc_folder, filename)
+                    try:
+                        stat = os.stat(filepath)
+                    except OSError:
+                        continue
+                    self._record_processed(filename, filepath, stat)
         
-        for filename in processed_files:
-            if filename.endswith(".docx"):
-                filepath = os.path.join(doc_folder, filename)
-                if os.path.exists(filepath):
-                    self.cache["documents"][filename] = self._get_file_metadata(filepath)
+        if not self._dirty and not self._log_records:
+            print("✅ Document cache already up to date")
+            return
         
         self.cache["last_updated"] = datetime.now().isoformat()
         self._save_cache()
         print(f"💾 Updated document cache for {len(processed_files)} files")
     
+    def _record_processed(self, filename: str, filepath: str, stat: os.stat_result):
+        """Update one cache entry, reusing metadata from get_changed_documents when still valid"""
+        pending = self._pending_metadata.pop(filename, None)
+        if pending and self._fast_metadata_matches(pending, self._get_fast_metadata(stat)):
+            metadata = dict(pending, last_processed=datetime.now().isoformat())
+        else:
+            metadata = self._get_full_metadata(filepath, stat)
+        
+        cached = self.cache["documents"].get(filename)
+        if cached and all(cached.get(k) == metadata.get(k) for k in ("size", "modified", "hash")):
+            return
+        self.cache["documents"][filename] = metadata
+        self._log_records.append({"filename": filename, "action": "put", "metadata": metadata})
+    
     def force_reprocess_all(self):
         """Clear cache to force reprocessing of all documents"""
         self.cache = {"documents": {}, "last_updated": None}
+        self._pending_metadata.clear()
+        self._log_records = []
+        self._dirty = True
         self._save_cache()
         print("🔄 Cleared document cache - all documents will be reprocessed")
     
@@ -127,3 +286,13 @@ class DocumentTracker:
             "last_updated": self.cache.get("last_updated"),
             "cached_files": list(self.cache["documents"].keys())
         }
+
+_TRACKER_SINGLETON: Optional[DocumentTracker] = None
+
+def get_tracker(cache_file: str = "document_cache.msgpack") -> DocumentTracker:
+    """Shared DocumentTracker, reloaded only when its cache files changed on disk"""
+    global _TRACKER_SINGLETON
+    tracker = _TRACKER_SINGLETON
+    if tracker is None or tracker.cache_file != cache_file or tracker.is_stale():
+        tracker = _TRACKER_SINGLETON = DocumentTracker(cache_file)
+    return tracker
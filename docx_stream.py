@@ -0,0 +1,123 @@
+"""
+Streaming .docx paragraph reader
+Reads body paragraphs straight from the package XML with lxml iterparse,
+matching python-docx's doc.paragraphs / para.style.name / para.text output
+"""
+import posixpath
+import zipfile
+from typing import Dict, Iterator, Tuple
+from lxml import etree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_PKG_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+_OFFICE_DOCUMENT = "/officeDocument"
+_STYLES = "/styles"
+
+_BODY = _W + "body"
+_P = _W + "p"
+_R = _W + "r"
+_HYPERLINK = _W + "hyperlink"
+_T = _W + "t"
+_TAB = _W + "tab"
+_PTAB = _W + "ptab"
+_BR = _W + "br"
+_CR = _W + "cr"
+_NO_BREAK_HYPHEN = _W + "noBreakHyphen"
+_VAL = _W + "val"
+
+# Built-in style names stored lower-case in styles.xml but shown (and reported
+# by python-docx) in title case
+_UI_STYLE_NAMES = {"caption": "Caption", "footer": "Footer", "header": "Header"}
+_UI_STYLE_NAMES.update({f"heading {i}": f"Heading {i}" for i in range(1, 10)})
+
+_ON_VALUES = {"1", "true", "on"}
+
+
+def _rel_target(z: zipfile.ZipFile, source: str, rel_type: str, default: str) -> str:
+    """Resolve the part name of the first relationship of rel_type from source"""
+    base = posixpath.dirname(source)
+    rels = posixpath.join(base, "_rels", posixpath.basename(source) + ".rels")
+    try:
+        root = etree.fromstring(z.read(rels))
+    except KeyError:
+        return default
+    for rel in root.iter(_PKG_RELS):
+        if rel.get("Type", "").endswith(rel_type) and rel.get("TargetMode") != "External":
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                return target[1:]
+            return posixpath.normpath(posixpath.join(base, target))
+    return default
+
+
+def _paragraph_styles(z: zipfile.ZipFile, styles_part: str) -> Tuple[Dict[str, str], str]:
+    """Map paragraph styleId -> UI style name, plus the default paragraph style name"""
+    names = {}
+    default = ""
+    try:
+        root = etree.fromstring(z.read(styles_part))
+    except KeyError:
+        return names, default
+    for style in root.iter(_W + "style"):
+        if style.get(_W + "type", "paragraph") != "paragraph":
+            continue
+        name_el = style.find(_W + "name")
+        name = name_el.get(_VAL) if name_el is not None else None
+        name = _UI_STYLE_NAMES.get(name, name) or ""
+        style_id = style.get(_W + "styleId")
+        if style_id is not None:
+            names[style_id] = name
+        if style.get(_W + "default", "").lower() in _ON_VALUES:
+            default = name  # last default in document order wins
+    return names, default
+
+
+def _run_text(run) -> str:
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _T:
+            parts.append(child.text or "")
+        elif tag == _TAB or tag == _PTAB:
+            parts.append("\t")
+        elif tag == _BR:
+            if child.get(_W + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag == _CR:
+            parts.append("\n")
+        elif tag == _NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def _paragraph_text(p) -> str:
+    parts = []
+    for child in p:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(r) for r in child.iterchildren(_R))
+    return "".join(parts)
+
+
+def iter_paragraphs(filepath: str) -> Iterator[Tuple[str, str]]:
+    """Yield (style_name, text) for each top-level body paragraph of a .docx file"""
+    with zipfile.ZipFile(filepath) as z:
+        document_part = _rel_target(z, "", _OFFICE_DOCUMENT, "word/document.xml")
+        styles_part = _rel_target(z, document_part, _STYLES, "word/styles.xml")
+        style_names, default_style = _paragraph_styles(z, styles_part)
+
+        with z.open(document_part) as f:
+            for _, el in etree.iterparse(f, events=("end",)):
+                parent = el.getparent()
+                if parent is None or parent.tag != _BODY:
+                    continue
+                if el.tag == _P:
+                    p_style = el.find(f"{_W}pPr/{_W}pStyle")
+                    style_id = p_style.get(_VAL) if p_style is not None else None
+                    yield style_names.get(style_id, default_style), _paragraph_text(el)
+                # Body children are complete once they end: drop them (and any
+                # already-handled siblings) so memory stays flat on large files
+                el.clear()
+                while el.getprevious() is not None:
+                    del parent[0]
@@ -1,22 +1,135 @@
+import asyncio
+import hashlib
+import logging
+import weakref
 import httpx
+import numpy as np
+import xxhash
+from cachetools import LRUCache
 from config import GEMINI_API_KEY
-from typing import List
+from typing import Dict, List, Sequence, Union
+
+logger = logging.getLogger(__name__)
 
 GEMINI_EMBEDDING_URL = "https://generativelanguage.googleapis.com/v1beta/models/embedding-001:embedContent"
+GEMINI_BATCH_EMBEDDING_URL = "https://generativelanguage.googleapis.com/v1beta/models/embedding-001:batchEmbedContents"
+EMBEDDING_MODEL = "models/embedding-001"
+BATCH_LIMIT = 100  # Max requests per batchEmbedContents call
+QUERY_CACHE_SIZE = 1024  # Query embeddings kept for repeated queries
+SINGLE_EMBED_CONCURRENCY = 8  # In-flight embedContent calls when falling back from the batch endpoint
+RATE_LIMIT_RETRIES = 5  # Retries of a request answered 429 before giving up
+RATE_LIMIT_BACKOFF = 1.0  # Seconds before the first retry, doubled after each one
+EMBED_CONCURRENCY = 16  # Max in-flight batch requests in embed_chunks
+EMBED_BATCH = 64  # Texts per batchEmbedContents request in embed_chunks
 
-async def get_gemini_embedding(text: str) -> List[float]:
+# One pooled HTTP/2 client per event loop: ingestion may call asyncio.run()
+# repeatedly, and an httpx client cannot be reused across loops
+_CLIENTS = weakref.WeakKeyDictionary()
+
+def _client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(60.0),
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+        )
+        _CLIENTS[loop] = client
+    return client
+
+async def close_client():
+    """Close the embedding client bound to the running loop (call on shutdown)"""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def _post(url: str, data: dict) -> httpx.Response:
+    """POST to Gemini, backing off exponentially (or per Retry-After) on 429 responses"""
     headers = {"Content-Type": "application/json"}
     params = {"key": GEMINI_API_KEY}
+    delay = RATE_LIMIT_BACKOFF
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        resp = await _client().post(url, headers=headers, params=params, json=data)
+        if resp.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+            break
+        retry_after = resp.headers.get("Retry-After", "")
+        await asyncio.sleep(float(retry_after) if retry_after.isdigit() else delay)
+        delay *= 2
+    resp.raise_for_status()
+    return resp
+
+async def get_gemini_embedding(text: str) -> List[float]:
     data = {"content": {"parts": [{"text": text}]}}
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(GEMINI_EMBEDDING_URL, headers=headers, params=params, json=data)
-        resp.raise_for_status()
-        result = resp.json()
-        return result["embedding"]["values"]
+    resp = await _post(GEMINI_EMBEDDING_URL, data)
+    result = resp.json()
+    return result["embedding"]["values"]
+
+# Exact-match cache of query embeddings keyed by SHA-256 of the query text;
+# near-duplicate queries are caught later by the response cache in gemini_cache
+_QUERY_CACHE = LRUCache(maxsize=QUERY_CACHE_SIZE)
+
+async def get_query_embedding(text: str) -> List[float]:
+    """get_gemini_embedding with repeated queries served from an LRU cache"""
+    key = hashlib.sha256(text.encode('utf-8')).digest()
+    embedding = _QUERY_CACHE.get(key)
+    if embedding is None:
+        embedding = await get_gemini_embedding(text)
+        _QUERY_CACHE[key] = embedding
+    return embedding
+
+async def _batch_embed(texts: List[str]) -> List[List[float]]:
+    data = {"requests": [{"model": EMBEDDING_MODEL, "content": {"parts": [{"text": t}]}} for t in texts]}
+    resp = await _post(GEMINI_BATCH_EMBEDDING_URL, data)
+    return [e["values"] for e in resp.json()["embeddings"]]
+
+async def get_gemini_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed many texts with batchEmbedContents (up to 100 per call), preserving order"""
+    if not texts:
+        return []
+    batches = [texts[i:i + BATCH_LIMIT] for i in range(0, len(texts), BATCH_LIMIT)]
+    try:
+        results = await asyncio.gather(*[_batch_embed(batch) for batch in batches])
+    except httpx.HTTPStatusError as e:
+        # Only a batch endpoint that rejects the request (400) or is missing (404)
+        # is worth retrying text by text; rate limits and server errors propagate
+        if e.response.status_code not in (400, 404):
+            raise
+        sem = asyncio.Semaphore(SINGLE_EMBED_CONCURRENCY)
+        
+        async def embed_one(text: str) -> List[float]:
+            async with sem:
+                return await get_gemini_embedding(text)
+        
+        return list(await asyncio.gather(*[embed_one(t) for t in texts]))
+    return [values for batch in results for values in batch]
+
+async def embed_chunks(chunks: List[Dict], label: str = "chunk"):
+    """Set each chunk's "embedding" (a float32 array) with concurrent, bounded batch
+    requests; a batch that fails gets dummy embeddings instead"""
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+    groups = [chunks[i:i + EMBED_BATCH] for i in range(0, len(chunks), EMBED_BATCH)]
+
+    async def embed_group(group: List[Dict]):
+        async with sem:
+            try:
+                embeddings = await get_gemini_embeddings([chunk["text"] for chunk in group])
+            except Exception as e:
+                logger.warning("Embedding failed for %d %ss, using fallback: %s", len(group), label, e)
+                embeddings = [dummy_embedding(chunk["text"]) for chunk in group]
+            # Keep embeddings as compact float32 arrays; stores convert at their boundary
+            for chunk, embedding in zip(group, embeddings):
+                chunk["embedding"] = np.asarray(embedding, dtype=np.float32)
+
+    await asyncio.gather(*[embed_group(group) for group in groups])
+
+def to_list(vector: Union[np.ndarray, Sequence[float]]) -> List[float]:
+    """Plain list of floats for JSON/Bolt boundaries (embeddings are float32 arrays internally)"""
+    return vector.tolist() if isinstance(vector, np.ndarray) else list(vector)
 
 # Fallback: dummy embedding (for local dev)
 def dummy_embedding(text: str) -> List[float]:
-    import numpy as np
-    import hashlib
-    h = int(hashlib.md5(text.encode()).hexdigest(), 16)
-    return list(np.array([((h >> i) & 0xFF) / 255.0 for i in range(256)])[:256])
+    # 16-byte xxh3_128 digest tiled to 256 bytes and scaled to [0, 1] in one numpy op
+    digest = xxhash.xxh3_128(text.encode()).digest()
+    arr = np.frombuffer(digest * 16, dtype=np.uint8).astype(np.float32) * (1.0 / 255.0)
+    return arr.tolist()
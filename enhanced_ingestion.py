@@ -2,80 +2,59 @@
 Enhanced File Ingestion with Section-Level Processing
 Only processes changed sections instead of entire files
 """
-import os
-from typing import List, Dict, Optional
-from docx import Document
-import tiktoken
-from section_tracker import SectionTracker
+from typing import Iterator, List, Dict, Optional
+from chunk_ids import chunk_uuid, text_hash
+from file_ingestion import chunk_text, get_doc_type
+from section_tracker import SectionTracker, get_tracker
 
-def get_doc_type(filename: str) -> str:
-    """Determine document type from filename"""
-    lowered = filename.lower()
-    if "prd" in lowered:
-        return "PRD"
-    if "hld" in lowered:
-        return "HLD"
-    if "lld" in lowered:
-        return "LLD"
-    if "api" in lowered:
-        return "API_SPEC"
-    if "architecture" in lowered:
-        return "ARCHITECTURE"
-    return "OTHER"
-
-def chunk_section_text(text: str, max_tokens: int = 800) -> List[str]:
-    """Chunk section text into manageable pieces"""
-    try:
-        enc = tiktoken.get_encoding("cl100k_base")
-        tokens = enc.encode(text)
-        chunks = []
-        for i in range(0, len(tokens), max_tokens):
-            chunk = enc.decode(tokens[i:i+max_tokens])
-            chunks.append(chunk)
-        return chunks
-    except Exception:
-        # Fallback: split by words
-        words = text.split()
-        return [" ".join(words[i:i+500]) for i in range(0, len(words), 500)]
-
-def process_section_to_chunks(section: Dict, filename: str, doc_type: str) -> List[Dict]:
-    """Convert a section into document chunks"""
-    chunks = []
+def iter_section_chunks(section: Dict, filename: str, doc_type: str) -> Iterator[Dict]:
+    """Yield the document chunks of a section
+    
+    Every chunk is yielded, each with the text_hash that ingestion uses to
+    reuse the stored vector of text that is already embedded.
+    """
     section_title = section.get("title", "Untitled Section")
     section_content = section.get("content", "")
     
     if not section_content.strip():
-        return chunks
+        return
     
     # Chunk the section content
-    text_chunks = chunk_section_text(section_content)
+    text_chunks = chunk_text(section_content)
     
-    for chunk_idx, chunk_text in enumerate(text_chunks):
-        if chunk_text.strip():
-            chunks.append({
-                "text": chunk_text.strip(),
+    for chunk_idx, piece in enumerate(text_chunks):
+        text = piece.strip()
+        if text:
+            chunk_id = chunk_uuid(filename, section.get('section_id', 0), chunk_idx)
+            yield {
+                "text": text,
                 "file_name": filename,
                 "section_title": section_title,
                 "section_id": section.get("section_id", 0),
-                "chunk_id": f"{filename}_{section.get('section_id', 0)}_{chunk_idx}",
+                "chunk_id": chunk_id,
+                "text_hash": text_hash(text),
                 "doc_type": doc_type,
                 "section_hash": section.get("hash", "")
-            })
-    
-    return chunks
+            }
+
+def process_section_to_chunks(section: Dict, filename: str, doc_type: str) -> List[Dict]:
+    """Convert a section into document chunks (list form of iter_section_chunks)"""
+    return list(iter_section_chunks(section, filename, doc_type))
 
-def ingest_documents_sectioned(folder: str, force_reprocess: bool = False) -> Dict[str, List[Dict]]:
+def ingest_documents_sectioned(folder: str, force_reprocess: bool = False,
+                               tracker: Optional[SectionTracker] = None) -> Dict[str, List[Dict]]:
     """
     Intelligently ingest documents with section-level change detection
     
     Args:
         folder: Path to documents folder
         force_reprocess: If True, reprocess all sections regardless of cache
+        tracker: SectionTracker to use (defaults to the shared get_tracker())
     
     Returns:
         Dict with 'new_chunks': new chunks, 'modified_chunks': updated chunks, 'stats': processing stats
     """
-    tracker = SectionTracker()
+    tracker = tracker or get_tracker()
     
     if force_reprocess:
         print("🔄 Force reprocessing all sections...")
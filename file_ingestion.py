@@ -1,84 +1,114 @@
+import multiprocessing
 import os
-from typing import List, Dict, Optional
-from docx import Document
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+import orjson
 import tiktoken
-from document_tracker import DocumentTracker
+from chunk_ids import chunk_uuid
+from document_tracker import get_tracker
+from docx_stream import iter_paragraphs
+
+# Load the BPE tables once per process; None (e.g. offline with no cached
+# encoding) makes the chunkers use the word-based fallback
+try:
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENC = None
+
+# Filename keyword -> doc type, in match priority order (none of the keywords
+# can overlap, so findall sees every occurrence)
+_DOC_TYPE_MAP = {"prd": "PRD", "hld": "HLD", "lld": "LLD", "api": "API_SPEC", "architecture": "ARCHITECTURE"}
+_DOC_TYPE_PRIORITY = list(_DOC_TYPE_MAP)
+_DOC_TYPE_RE = re.compile("|".join(_DOC_TYPE_PRIORITY))
 
 def get_doc_type(filename: str) -> str:
     # Simple heuristic based on filename
     lowered = filename.lower()
-    if "prd" in lowered:
-        return "PRD"
-    if "hld" in lowered:
-        return "HLD"
-    if "lld" in lowered:
-        return "LLD"
-    if "api" in lowered:
-        return "API_SPEC"
-    if "architecture" in lowered:
-        return "ARCHITECTURE"
-    return "OTHER"
-
-def extract_sections(doc: Document) -> List[Dict]:
-    # Extracts paragraphs and tries to infer section headings
+    # One scan finds every keyword; the earliest in priority order wins
+    found = _DOC_TYPE_RE.findall(lowered)
+    if not found:
+        return "OTHER"
+    return _DOC_TYPE_MAP[min(found, key=_DOC_TYPE_PRIORITY.index)]
+
+def extract_sections(paragraphs: Iterable[Tuple[str, str]]) -> List[Dict]:
+    # Extracts paragraphs ((style_name, text) pairs) and tries to infer section headings
+    # Paragraph lines are collected per section and joined once at the boundary
     sections = []
-    current_section = {"title": None, "text": ""}
-    for para in doc.paragraphs:
-        if para.style.name.startswith("Heading"):
-            if current_section["text"]:
-                sections.append(current_section)
-            current_section = {"title": para.text, "text": ""}
+    title, lines = None, []
+    for style_name, text in paragraphs:
+        if style_name.startswith("Heading"):
+            if lines:
+                sections.append({"title": title, "text": "\n".join(lines) + "\n"})
+            title, lines = text, []
         else:
-            current_section["text"] += para.text + "\n"
-    if current_section["text"]:
-        sections.append(current_section)
+            lines.append(text)
+    if lines:
+        sections.append({"title": title, "text": "\n".join(lines) + "\n"})
     return sections
 
 def chunk_text(text: str, max_tokens: int = 800) -> List[str]:
     # Use tiktoken to count tokens (fallback: split by ~500 words)
     try:
-        enc = tiktoken.get_encoding("cl100k_base")
-        tokens = enc.encode(text)
-        chunks = []
-        for i in range(0, len(tokens), max_tokens):
-            chunk = enc.decode(tokens[i:i+max_tokens])
-            chunks.append(chunk)
-        return chunks
+        if _ENC is None:
+            raise RuntimeError("tiktoken encoding unavailable")
+        tokens = _ENC.encode(text)
+        # Decode all windows in one call instead of one FFI round-trip per chunk
+        return _ENC.decode_batch([tokens[i:i+max_tokens] for i in range(0, len(tokens), max_tokens)])
     except Exception:
         # Fallback: split by words
         words = text.split()
         return [" ".join(words[i:i+500]) for i in range(0, len(words), 500)]
 
-def process_docx_file(filepath: str) -> List[Dict]:
-    doc = Document(filepath)
+def iter_docx_chunks(filepath: str) -> Iterator[Dict]:
     file_name = os.path.basename(filepath)
     doc_type = get_doc_type(file_name)
-    sections = extract_sections(doc)
-    chunks = []
-    for section in sections:
+    sections = extract_sections(iter_paragraphs(filepath))
+    for section_idx, section in enumerate(sections):
         section_title = section["title"]
-        for chunk in chunk_text(section["text"]):
+        for chunk_idx, chunk in enumerate(chunk_text(section["text"])):
             if chunk.strip():
-                chunks.append({
+                yield {
                     "text": chunk.strip(),
                     "file_name": file_name,
                     "section_title": section_title,
+                    "chunk_id": chunk_uuid(file_name, section_idx, chunk_idx),
                     "doc_type": doc_type
-                })
-    return chunks
+                }
 
-def ingest_documents(folder: str, force_reprocess: bool = False) -> List[Dict]:
+def process_docx_file(filepath: str) -> List[Dict]:
+    # List form of iter_docx_chunks, so results can be returned from worker processes
+    return list(iter_docx_chunks(filepath))
+
+def _file_chunks(filepath: str, get_chunks, processed_files: List[str]) -> List[Dict]:
+    """One file's chunks, reporting per-file failures without aborting ingestion"""
+    try:
+        chunks = get_chunks()
+        processed_files.append(os.path.basename(filepath))
+        print(f"✅ Processed {os.path.basename(filepath)}: {len(chunks)} chunks")
+        return chunks
+    except Exception as e:
+        print(f"❌ Failed to process {os.path.basename(filepath)}: {e}")
+        return []
+
+def iter_documents(folder: str, force_reprocess: bool = False) -> Iterator[Dict]:
     """
     Intelligently ingest documents - only process changed/new files
     
+    Chunks are yielded file by file so consumers can batch them without holding
+    every chunk in memory; the document cache is updated once the generator is
+    exhausted.
+    
     Args:
         folder: Path to documents folder
         force_reprocess: If True, reprocess all documents regardless of cache
     
-    Returns:
-        List of document chunks from new/modified documents only
+    Yields:
+        Document chunks from new/modified documents only
     """
-    tracker = DocumentTracker()
+    tracker = get_tracker()
     
     if force_reprocess:
         print("🔄 Force reprocessing all documents...")
@@ -93,28 +123,90 @@ def ingest_documents(folder: str, force_reprocess: bool = False) -> List[Dict]:
     if not files_to_process:
         print("✅ No document changes detected - skipping ingestion")
         print(f"📊 Cache stats: {tracker.get_cache_stats()}")
-        return []
+        return
     
     print(f"📄 Processing {len(files_to_process)} documents:")
     print(f"   📝 New: {len(changes['new'])}")
     print(f"   🔄 Modified: {len(changes['modified'])}")
     print(f"   ✅ Unchanged: {len(changes['unchanged'])}")
     
-    all_chunks = []
     processed_files = []
     
-    for filepath in files_to_process:
-        try:
-            chunks = process_docx_file(filepath)
-            all_chunks.extend(chunks)
-            processed_files.append(os.path.basename(filepath))
-            print(f"✅ Processed {os.path.basename(filepath)}: {len(chunks)} chunks")
-        except Exception as e:
-            print(f"❌ Failed to process {os.path.basename(filepath)}: {e}")
+    # Parse and tokenize files in parallel worker processes; results are
+    # collected in submission order so chunk order matches the serial version.
+    # Workers are spawned rather than forked, since main.py runs this on a
+    # thread while the event loop and database clients hold locks in others
+    workers = min(len(files_to_process), os.cpu_count() or 1)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(process_docx_file, filepath) for filepath in files_to_process]
+            for filepath, future in zip(files_to_process, futures):
+                yield from _file_chunks(filepath, future.result, processed_files)
+    else:
+        for filepath in files_to_process:
+            yield from _file_chunks(filepath, lambda: process_docx_file(filepath), processed_files)
     
     # Update cache for successfully processed files
     if processed_files:
         tracker.mark_documents_processed(folder, processed_files)
         print(f"💾 Successfully processed {len(processed_files)} documents")
-    
-    return all_chunks
+
+def ingest_documents(folder: str, force_reprocess: bool = False) -> List[Dict]:
+    """List of document chunks from new/modified documents (see iter_documents)"""
+    return list(iter_documents(folder, force_reprocess))
+
+class ChunkBatchStore:
+    """Disk-backed chunk spool: chunks are written to temporary JSONL shards of
+    batch_size chunks and read back one shard (batch) at a time, so large corpora
+    never sit in memory all at once. Use as a context manager to remove the shards."""
+
+    def __init__(self, batch_size: int = 500, directory: Optional[str] = None):
+        self.batch_size = batch_size
+        self.directory = tempfile.mkdtemp(prefix="chunks_", dir=directory)
+        self._shards: List[str] = []
+        self._pending: List[Dict] = []
+        self._count = 0
+
+    def add(self, chunk: Dict):
+        self._pending.append(chunk)
+        self._count += 1
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def extend(self, chunks: Iterable[Dict]):
+        for chunk in chunks:
+            self.add(chunk)
+        self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        path = os.path.join(self.directory, f"shard_{len(self._shards):06d}.jsonl")
+        with open(path, "wb") as f:
+            f.write(b"\n".join(orjson.dumps(chunk, option=orjson.OPT_SERIALIZE_NUMPY) for chunk in self._pending))
+        self._shards.append(path)
+        self._pending = []
+
+    def batches(self) -> Iterator[List[Dict]]:
+        """Yield stored chunks one shard-sized batch at a time (fresh dicts per call)"""
+        self._flush()
+        for path in self._shards:
+            with open(path, "rb") as f:
+                yield [orjson.loads(line) for line in f.read().split(b"\n")]
+
+    def __iter__(self) -> Iterator[Dict]:
+        for batch in self.batches():
+            yield from batch
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._shards, self._pending = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
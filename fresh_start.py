@@ -6,12 +6,27 @@ Clears all data and rebuilds knowledge graph from scratch
 import os
 import sys
 
+def semcache_path() -> str:
+    """The semantic response cache file (SEMCACHE_PATH, else its default)"""
+    try:
+        from config import SEMCACHE_PATH
+        return SEMCACHE_PATH
+    except Exception:
+        from gemini_cache import CACHE_PATH
+        return CACHE_PATH
+
 def clear_all_data():
     """Clear all cached data and force fresh processing"""
     print("🧹 Starting fresh data cleanup...")
     
     # Clear document cache
-    cache_files = ["document_cache.json", "section_cache.json"]
+    cache_files = [
+        "document_cache.msgpack", "document_cache.msgpack.log", "section_cache.msgpack",
+        "chunk_hash_index.json",  # no longer written; removed if an older run left it
+        "document_cache.json", "section_cache.json",  # legacy JSON caches
+        semcache_path(),
+        os.path.join(os.path.expanduser("~"), ".graphrag", "semcache.db"),  # old response cache location
+    ]
     for cache_file in cache_files:
         if os.path.exists(cache_file):
             os.remove(cache_file)
@@ -31,13 +46,28 @@ def clear_all_data():
         
         print("\n🗑️  Clearing Neo4j database...")
         with graph.neo4j_graph.driver.session() as session:
-            result = session.run("MATCH (n) DETACH DELETE n RETURN count(n) as deleted")
-            deleted = result.single()['deleted']
-            print(f"✅ Deleted {deleted} nodes from Neo4j")
+            # Delete in committed batches so large graphs don't build one huge transaction
+            try:
+                result = session.run("""
+                    CALL apoc.periodic.iterate(
+                        "MATCH (n) RETURN n",
+                        "DETACH DELETE n",
+                        {batchSize: 10000, parallel: false}
+                    )
+                    YIELD batches, committedOperations
+                    RETURN batches, committedOperations as deleted
+                """)
+                record = result.single()
+                print(f"✅ Deleted {record['deleted']} nodes from Neo4j in {record['batches']} batches")
+            except Exception as e:
+                print(f"⚠️  APOC batch delete unavailable ({e}), deleting in a single transaction")
+                result = session.run("MATCH (n) DETACH DELETE n RETURN count(n) as deleted")
+                deleted = result.single()['deleted']
+                print(f"✅ Deleted {deleted} nodes from Neo4j")
         
         print("🗑️  Clearing Qdrant collection...")
         try:
-            graph.qdrant_vector.client.delete_collection("document_chunks")
+            graph.qdrant_vector.recreate_collection()
             print("✅ Cleared Qdrant collection")
         except:
             print("💡 Qdrant collection will be recreated automatically")
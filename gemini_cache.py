@@ -0,0 +1,110 @@
+"""
+Semantic response cache for Gemini test-suite generation
+Stores generated TestSuites in SQLite keyed by context hash + query embedding
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from models import TestSuite
+
+CACHE_PATH = "semcache.db"  # Next to the document/section caches; SEMCACHE_PATH in config overrides it
+CACHE_TTL = 24 * 60 * 60
+SIMILARITY_THRESHOLD = 0.95
+
+
+def context_hash(context: str) -> str:
+    """Stable hash of the retrieved context used to namespace cache entries"""
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str = CACHE_PATH, ttl: int = CACHE_TTL,
+                 threshold: float = SIMILARITY_THRESHOLD):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                context_hash TEXT NOT NULL,
+                query TEXT NOT NULL,
+                embedding BLOB,
+                suite TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_context ON responses (context_hash, created_at)"
+        )
+        self._conn.commit()
+
+    def get(self, query: str, context: str,
+            query_embedding: Optional[List[float]] = None) -> Optional[TestSuite]:
+        """Return a cached suite for an identical or semantically equivalent query"""
+        ctx = context_hash(context)
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, embedding, suite FROM responses "
+                "WHERE context_hash = ? AND created_at >= ? ORDER BY created_at DESC",
+                (ctx, cutoff),
+            ).fetchall()
+        if not rows:
+            return None
+
+        for cached_query, _, suite in rows:
+            if cached_query == query:
+                return TestSuite.model_validate_json(suite)
+
+        if query_embedding is None:
+            return None
+
+        q = np.asarray(query_embedding, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        if q_norm == 0:
+            return None
+
+        best_score, best_suite = -1.0, None
+        for _, blob, suite in rows:
+            if blob is None:
+                continue
+            emb = np.frombuffer(blob, dtype=np.float32)
+            if emb.shape != q.shape:
+                continue
+            score = float(np.dot(q, emb) / (q_norm * (np.linalg.norm(emb) or 1.0)))
+            if score > best_score:
+                best_score, best_suite = score, suite
+
+        if best_suite is not None and best_score >= self.threshold:
+            return TestSuite.model_validate_json(best_suite)
+        return None
+
+    def put(self, query: str, context: str, suite: TestSuite,
+            query_embedding: Optional[List[float]] = None):
+        """Store a generated suite and drop entries older than the TTL"""
+        blob = None
+        if query_embedding is not None:
+            blob = np.asarray(query_embedding, dtype=np.float32).tobytes()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO responses (context_hash, query, embedding, suite, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (context_hash(context), query, blob, suite.model_dump_json(), now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -2,19 +2,57 @@
 Integrated GraphRAG system using Neo4j for knowledge graph and Qdrant for vector storage
 Supports both Neo4j Desktop/Aura and Qdrant Docker/Cloud modes
 """
-from typing import List, Dict, Optional
+import heapq
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, List, Dict, Optional
+from cachetools import TTLCache
+from neo4j import RoutingControl
 from neo4j_graph import Neo4jGraphRAG
 from qdrant_vector import QdrantVectorStore
-from config import QDRANT_MODE, NEO4J_MODE
+from background_loop import BackgroundLoop
+from embedding import embed_chunks, close_client
+from chunk_ids import assign_chunk_id, text_hash
+from config import QDRANT_MODE, NEO4J_MODE, NEO4J_DATABASE, INGEST_BATCH
 import logging
 
 logger = logging.getLogger(__name__)
 
+EXPANSION_HOPS = 2  # Graph hops followed from vector hits in get_relevant_chunks
+
+# Ingested chunk content doesn't change, so lookups are cached briefly and the
+# caches are dropped whenever new chunks are written
+CACHE_MAXSIZE = 10_000
+CACHE_TTL = 600  # seconds
+
+# Read queries are fixed strings varying only by parameters, so they are built
+# once here and Neo4j's plan cache hits on every call
+SEMANTIC_RELATIONSHIPS_QUERY = """
+    MATCH (c:Chunk {chunk_id: $chunk_id})-[r:SEMANTICALLY_SIMILAR]-(related:Chunk)
+    USING INDEX c:Chunk(chunk_id)
+    RETURN related.chunk_id as chunk_id,
+           related.file_name as file_name,
+           related.section_title as section_title,
+           related.doc_type as doc_type,
+           r.similarity as similarity_score
+    ORDER BY r.similarity DESC
+    LIMIT 10
+"""
+CHUNK_COUNT_QUERY = "MATCH (c:Chunk) RETURN count(c) as chunk_count"
+HAS_CHUNKS_QUERY = "MATCH (c:Chunk) RETURN 1 LIMIT 1"
+
 class IntegratedGraphRAG:
     def __init__(self):
         """Initialize both Neo4j and Qdrant connections with proper error handling"""
         self.neo4j_graph = None
         self.qdrant_vector = None
+        self._chunk_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+        self._file_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+        self._expand_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+        # One event loop for the object's lifetime, so the pooled embedding
+        # client and its connections are reused across ingestion windows
+        self._loop = BackgroundLoop()
         
         # Try to initialize Neo4j
         try:
@@ -34,7 +72,7 @@ class IntegratedGraphRAG:
         
         # Try to initialize Qdrant
         try:
-            self.qdrant_vector = QdrantVectorStore()
+            self.qdrant_vector = QdrantVectorStore.get()
             if QDRANT_MODE == "cloud":
                 print("✅ Qdrant Cloud connected")
             else:
@@ -52,45 +90,59 @@ class IntegratedGraphRAG:
 
     def create_chunk_nodes(self, chunks: List[Dict]):
         """Create chunk nodes in both Neo4j and Qdrant"""
-        # Add chunk IDs if not present
-        for i, chunk in enumerate(chunks):
-            if 'chunk_id' not in chunk:
-                chunk['chunk_id'] = i
+        # Add chunk IDs if not present (derived from file and text, so stable across calls)
+        for chunk in chunks:
+            assign_chunk_id(chunk)
+        self._clear_caches()
         
-        # Store in Neo4j if available
-        if self.neo4j_graph:
-            print("🔄 Creating chunk nodes in Neo4j...")
-            try:
-                self.neo4j_graph.create_chunk_nodes(chunks)
-            except Exception as e:
-                print(f"⚠️  Neo4j storage failed: {e}")
+        # Write in fixed-size batches so each request carries a bounded payload
+        batches = [chunks[start:start + INGEST_BATCH] for start in range(0, len(chunks), INGEST_BATCH)]
         
-        # Store embeddings in Qdrant (required)
-        print("🔄 Storing embeddings in Qdrant...")
-        self.qdrant_vector.store_embeddings(chunks)
+        # Neo4j and Qdrant writes are independent network I/O: run them side by side
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            neo4j_future = pool.submit(self._store_in_neo4j, batches) if self.neo4j_graph else None
+            qdrant_future = pool.submit(self._store_in_qdrant, batches)
+            qdrant_future.result()  # Qdrant is required: its errors propagate
+            if neo4j_future is not None:
+                neo4j_future.result()
         
-        print("✅ Chunks created successfully")
+        logger.info("Chunks created successfully")
+
+    def _store_in_neo4j(self, batches: List[List[Dict]]):
+        """Store chunk batches in Neo4j; failures are logged, not raised (Neo4j is optional)"""
+        logger.debug("Creating chunk nodes in Neo4j")
+        try:
+            for batch in batches:
+                self.neo4j_graph.create_chunk_nodes(batch)
+        except Exception as e:
+            logger.warning("Neo4j storage failed: %s", e)
 
-    def link_chunks(self, chunks: List[Dict]):
+    def _store_in_qdrant(self, batches: List[List[Dict]]):
+        """Store chunk embedding batches in Qdrant (required)"""
+        logger.debug("Storing embeddings in Qdrant")
+        for batch in batches:
+            self.qdrant_vector.store_embeddings(batch)
+
+    def link_chunks(self, chunks: List[Dict], semantic: bool = True):
         """Create relationships between chunks in Neo4j"""
         if self.neo4j_graph:
-            print("🔄 Creating relationships in Neo4j...")
+            logger.debug("Creating relationships in Neo4j")
             try:
-                self.neo4j_graph.link_chunks(chunks)
-                print("✅ Chunk relationships created in Neo4j")
+                self.neo4j_graph.link_chunks(chunks, semantic=semantic)
+                logger.info("Chunk relationships created in Neo4j")
             except Exception as e:
-                print(f"⚠️  Neo4j relationship creation failed: {e}")
+                logger.warning("Neo4j relationship creation failed: %s", e)
         else:
-            print("⚠️  Neo4j not available, skipping relationship creation")
+            logger.warning("Neo4j not available, skipping relationship creation")
 
-    def get_relevant_chunks(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    def get_relevant_chunks(self, query_embedding: np.ndarray, top_k: int = 5) -> List[Dict]:
         """
         Hybrid search: Use Qdrant for vector similarity, optionally expand with Neo4j
         """
-        print("🔍 Starting search...")
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
         
         # Step 1: Vector similarity search in Qdrant
-        print("📊 Performing vector search in Qdrant...")
+        logger.debug("Performing vector search in Qdrant")
         qdrant_chunks = self.qdrant_vector.search_similar(
             query_embedding=query_embedding, 
             top_k=top_k,
@@ -98,77 +150,140 @@ class IntegratedGraphRAG:
         )
         
         if not qdrant_chunks:
-            print("⚠️ No similar chunks found in Qdrant")
+            logger.info("No similar chunks found in Qdrant")
             return []
         
         # Step 2: Expand context using Neo4j if available
         if self.neo4j_graph:
             try:
                 chunk_ids = [chunk['chunk_id'] for chunk in qdrant_chunks]
-                print("📖 Expanding context using Neo4j relationships...")
-                expanded_chunks = self.neo4j_graph.expand_context(chunk_ids, hops=2)
-                
-                # Combine and deduplicate results
-                all_chunks = {}
-                for chunk in qdrant_chunks:
-                    all_chunks[chunk['chunk_id']] = chunk
-                for chunk in expanded_chunks:
-                    chunk_id = chunk['chunk_id']
-                    if chunk_id not in all_chunks:
-                        all_chunks[chunk_id] = chunk
+                logger.debug("Expanding context using Neo4j relationships")
+                limit = top_k * (EXPANSION_HOPS + 1)
+                expanded_chunks = self.neo4j_graph.expand_context(
+                    chunk_ids, hops=EXPANSION_HOPS,
+                    seed_scores={chunk['chunk_id']: chunk['similarity_score'] for chunk in qdrant_chunks},
+                    cap=top_k * 5
+                )
+                expanded_chunks = self._hydrate_payloads(expanded_chunks)
                 
-                result_chunks = list(all_chunks.values())
-                result_chunks.sort(key=lambda x: x.get('similarity_score', 0), reverse=True)
+                # Both lists arrive sorted by score (Neo4j decays seed scores per
+                # hop server-side): merge them and dedupe inline, first seen wins
+                merged = heapq.merge(qdrant_chunks, expanded_chunks, key=lambda x: -x.get('similarity_score', 0))
+                result_chunks = self._dedupe_chunks(merged, limit)
                 
-                print(f"✅ Hybrid search completed: {len(qdrant_chunks)} from Qdrant + {len(expanded_chunks)} expanded = {len(result_chunks)} total")
+                logger.debug("Hybrid search completed: %d from Qdrant + %d expanded = %d total",
+                             len(qdrant_chunks), len(expanded_chunks), len(result_chunks))
                 return result_chunks
                 
             except Exception as e:
-                print(f"⚠️  Neo4j expansion failed: {e}, using Qdrant results only")
+                logger.warning("Neo4j expansion failed: %s, using Qdrant results only", e)
         
         # Fallback: Return Qdrant results only
-        print(f"✅ Vector search completed: {len(qdrant_chunks)} chunks found")
+        logger.debug("Vector search completed: %d chunks found", len(qdrant_chunks))
         return qdrant_chunks
 
-    def expand_context(self, chunk_ids: List[int], hops: int = 2) -> List[Dict]:
+    @staticmethod
+    def _dedupe_chunks(chunks: Iterable[Dict], limit: int) -> List[Dict]:
+        """First occurrence of each chunk_id, up to limit chunks"""
+        seen = set()
+        result = []
+        for chunk in chunks:
+            chunk_id = chunk['chunk_id']
+            if chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            result.append(chunk)
+            if len(result) == limit:
+                break
+        return result
+
+    def _hydrate_payloads(self, chunks: List[Dict]) -> List[Dict]:
+        """Fill in text/metadata missing from graph results with one bulk Qdrant fetch
+        
+        Chunks whose text can't be resolved are dropped from the returned list.
+        """
+        missing_ids = [chunk['chunk_id'] for chunk in chunks if chunk.get('text') is None]
+        if not missing_ids:
+            return chunks
+        payloads = self.qdrant_vector.get_chunks_bulk(missing_ids)
+        for chunk in chunks:
+            payload = payloads.get(chunk['chunk_id'])
+            if payload is not None and chunk.get('text') is None:
+                for key, value in payload.items():
+                    if chunk.get(key) is None:
+                        chunk[key] = value
+        return [chunk for chunk in chunks if chunk.get('text') is not None]
+
+    def _reuse_stored_embeddings(self, chunks: List[Dict]) -> List[Dict]:
+        """Copy stored vectors onto chunks whose text is already embedded; return the rest"""
+        for chunk in chunks:
+            chunk.setdefault('text_hash', text_hash(chunk['text']))
+        stored = self.qdrant_vector.get_vectors_by_text_hash([chunk['text_hash'] for chunk in chunks])
+        remaining = []
+        for chunk in chunks:
+            vector = stored.get(chunk['text_hash'])
+            if vector is None:
+                remaining.append(chunk)
+            else:
+                chunk['embedding'] = np.asarray(vector, dtype=np.float32)
+        if stored:
+            logger.info("Reused %d stored embeddings", len(chunks) - len(remaining))
+        return remaining
+
+    def _clear_caches(self):
+        """Drop cached lookups (called when chunks are written)"""
+        self._chunk_cache.clear()
+        self._file_cache.clear()
+        self._expand_cache.clear()
+
+    def expand_context(self, chunk_ids: List[str], hops: int = 2) -> List[Dict]:
         """Expand context using Neo4j graph relationships"""
-        return self.neo4j_graph.expand_context(chunk_ids, hops)
+        key = (frozenset(chunk_ids), hops)
+        chunks = self._expand_cache.get(key)
+        if chunks is None:
+            # Text lives in Qdrant only
+            chunks = self._hydrate_payloads(self.neo4j_graph.expand_context(chunk_ids, hops))
+            self._expand_cache[key] = chunks
+        return chunks
 
     def get_chunks_by_file(self, file_name: str) -> List[Dict]:
         """Get all chunks from a specific file using Qdrant"""
-        return self.qdrant_vector.get_chunks_by_file(file_name)
+        chunks = self._file_cache.get(file_name)
+        if chunks is None:
+            chunks = self.qdrant_vector.get_chunks_by_file(file_name)
+            if chunks:
+                self._file_cache[file_name] = chunks
+        return chunks
 
-    def get_chunk_by_id(self, chunk_id: int) -> Optional[Dict]:
+    def get_chunk_by_id(self, chunk_id: str) -> Optional[Dict]:
         """Get a specific chunk by ID using Qdrant"""
-        return self.qdrant_vector.get_chunk_by_id(chunk_id)
+        chunk = self._chunk_cache.get(chunk_id)
+        if chunk is None:
+            chunk = self.qdrant_vector.get_chunk_by_id(chunk_id)
+            if chunk is not None:
+                self._chunk_cache[chunk_id] = chunk
+        return chunk
 
-    def search_semantic_relationships(self, chunk_id: int) -> List[Dict]:
+    def get_chunks_by_ids(self, chunk_ids: List[str]) -> List[Dict]:
+        """Get several chunks by ID, fetching the uncached ones from Qdrant in one request"""
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in self._chunk_cache]
+        for chunk in self.qdrant_vector.get_chunks_by_ids(missing):
+            self._chunk_cache[chunk['chunk_id']] = chunk
+        chunks = (self._chunk_cache.get(chunk_id) for chunk_id in chunk_ids)
+        return [chunk for chunk in chunks if chunk is not None]
+
+    def search_semantic_relationships(self, chunk_id: str) -> List[Dict]:
         """Find semantically related chunks using Neo4j"""
-        with self.neo4j_graph.driver.session() as session:
-            result = session.run("""
-                MATCH (c:Chunk {chunk_id: $chunk_id})-[r:SEMANTICALLY_SIMILAR]-(related:Chunk)
-                RETURN related.chunk_id as chunk_id,
-                       related.text as text,
-                       related.file_name as file_name,
-                       related.section_title as section_title,
-                       related.doc_type as doc_type,
-                       r.similarity as similarity
-                ORDER BY r.similarity DESC
-                LIMIT 10
-            """, chunk_id=chunk_id)
-            
-            chunks = []
-            for record in result:
-                chunks.append({
-                    'chunk_id': record['chunk_id'],
-                    'text': record['text'],
-                    'file_name': record['file_name'],
-                    'section_title': record['section_title'],
-                    'doc_type': record['doc_type'],
-                    'similarity_score': record['similarity']
-                })
-            
-            return chunks
+        records = self._read_query(SEMANTIC_RELATIONSHIPS_QUERY, chunk_id=chunk_id)
+        # Text lives in Qdrant only
+        return self._hydrate_payloads([record.data() for record in records])
+
+    def _read_query(self, query: str, **params) -> List:
+        """Run a read query on the driver's pooled sessions, routed to readers"""
+        records, _, _ = self.neo4j_graph.driver.execute_query(
+            query, parameters_=params, database_=NEO4J_DATABASE, routing_=RoutingControl.READ
+        )
+        return records
 
     def get_system_stats(self) -> Dict:
         """Get statistics about both systems"""
@@ -193,10 +308,7 @@ class IntegratedGraphRAG:
         
         try:
             # Test Neo4j connection
-            with self.neo4j_graph.driver.session() as session:
-                result = session.run("MATCH (c:Chunk) RETURN count(c) as chunk_count")
-                record = result.single()
-                stats['neo4j_chunk_count'] = record['chunk_count'] if record else 0
+            stats['neo4j_chunk_count'] = self.get_chunk_count()
         except Exception as e:
             stats['neo4j_connected'] = False
             logger.error(f"Neo4j stats error: {e}")
@@ -210,78 +322,101 @@ class IntegratedGraphRAG:
             self.neo4j_graph.close()
         if self.qdrant_vector:
             self.qdrant_vector.close()
+        self._loop.run(close_client())
+        self._loop.close()
         print("✅ All connections closed")
 
+    def get_chunk_count(self) -> int:
+        """Exact number of Chunk nodes in Neo4j (scans the label; use for stats only)"""
+        records = self._read_query(CHUNK_COUNT_QUERY)
+        return records[0]['chunk_count'] if records else 0
+
     def has_existing_data(self) -> Dict[str, bool]:
         """Check if the system already has data to avoid duplicates"""
         status = {
             'neo4j_has_data': False,
             'qdrant_has_data': False,
-            'total_chunks': 0,
             'total_points': 0
         }
         
         try:
-            # Check Neo4j for existing chunks
-            with self.neo4j_graph.driver.session() as session:
-                result = session.run("MATCH (c:Chunk) RETURN count(c) as chunk_count")
-                record = result.single()
-                chunk_count = record['chunk_count'] if record else 0
-                status['neo4j_has_data'] = chunk_count > 0
-                status['total_chunks'] = chunk_count
+            # Check Neo4j for existing chunks: one row is enough, no count needed
+            records = self._read_query(HAS_CHUNKS_QUERY)
+            status['neo4j_has_data'] = bool(records)
         except Exception as e:
             logger.warning(f"Could not check Neo4j data: {e}")
         
         try:
-            # Check Qdrant for existing points
-            collection_info = self.qdrant_vector.get_collection_info()
-            if collection_info:
-                points_count = collection_info.points_count or 0
-                status['qdrant_has_data'] = points_count > 0
-                status['total_points'] = points_count
+            # Check Qdrant for existing points (estimated count, no full scan)
+            points_count = self.qdrant_vector.count_points(exact=False)
+            status['qdrant_has_data'] = points_count > 0
+            status['total_points'] = points_count
         except Exception as e:
             logger.warning(f"Could not check Qdrant data: {e}")
         
         return status
 
-    def ingest_chunks(self, chunks: List[Dict]):
-        """Intelligently ingest chunks, avoiding duplicates"""
-        if not chunks:
+    def ingest_chunks(self, chunks: Iterable[Dict], batch_size: int = 512):
+        """Intelligently ingest chunks, avoiding duplicates
+        
+        Chunks may be any iterable (e.g. a generator from ingestion); they are
+        embedded and stored one window of batch_size at a time, so only one
+        window's embeddings are held in memory.
+        """
+        it = iter(chunks)
+        batch = list(islice(it, batch_size))
+        if not batch:
             logger.info("No chunks to ingest")
             return
         
-        logger.info(f"Ingesting {len(chunks)} chunks into knowledge graph")
+        logger.info("Ingesting chunks into knowledge graph")
         
         # Check for existing data
         existing_data = self.has_existing_data()
         
         if existing_data['neo4j_has_data'] or existing_data['qdrant_has_data']:
-            logger.info(f"Existing data found - Neo4j: {existing_data['total_chunks']} chunks, "
-                       f"Qdrant: {existing_data['total_points']} points")
+            logger.info("Existing data found - Neo4j: %s, Qdrant: ~%d points",
+                        'yes' if existing_data['neo4j_has_data'] else 'no', existing_data['total_points'])
             logger.info("Performing incremental update...")
         else:
             logger.info("No existing data found - performing initial ingestion")
         
         try:
-            # Generate embeddings for chunks that don't have them
-            chunks_to_embed = [chunk for chunk in chunks if 'embedding' not in chunk]
-            if chunks_to_embed:
-                logger.info(f"Generating embeddings for {len(chunks_to_embed)} chunks")
-                for i, chunk in enumerate(chunks_to_embed):
-                    try:
-                        from embedding import get_gemini_embedding, dummy_embedding
-                        import asyncio
-                        chunk["embedding"] = asyncio.run(get_gemini_embedding(chunk["text"]))
-                    except Exception as e:
-                        logger.warning(f"Embedding failed for chunk {i+1}, using fallback: {e}")
-                        chunk["embedding"] = dummy_embedding(chunk["text"])
+            total = 0
+            previous = None  # last chunk of the previous window, to link across windows
+            # HNSW indexing is paused for the whole load and the graph built once at the end
+            with self.qdrant_vector.bulk_ingest():
+                while batch:
+                    # Ids come from each chunk's file and position (or text), never
+                    # from a counter, so later runs can't overwrite other files' chunks
+                    for chunk in batch:
+                        assign_chunk_id(chunk)
+                    
+                    # Generate embeddings for chunks that don't have them, reusing the
+                    # stored vector when identical text is already in Qdrant
+                    chunks_to_embed = [chunk for chunk in batch if 'embedding' not in chunk]
+                    chunks_to_embed = self._reuse_stored_embeddings(chunks_to_embed)
+                    if chunks_to_embed:
+                        logger.info("Generating embeddings for %d chunks", len(chunks_to_embed))
+                        self._loop.run(embed_chunks(chunks_to_embed))
+                    
+                    # Store in Neo4j (handles duplicates internally)
+                    self.create_chunk_nodes(batch)
+                    self.link_chunks(batch if previous is None else [previous] + batch, semantic=False)
+                    
+                    total += len(batch)
+                    previous = batch[-1]
+                    batch = list(islice(it, batch_size))
             
-            # Store in Neo4j (handles duplicates internally)
-            self.create_chunk_nodes(chunks)
-            self.link_chunks(chunks)
+            # Semantic links compare against the whole graph: build them once at the end
+            if self.neo4j_graph:
+                try:
+                    self.neo4j_graph.build_semantic_links()
+                except Exception as e:
+                    logger.warning("Neo4j semantic relationship creation failed: %s", e)
             
-            logger.info(f"✅ Successfully ingested {len(chunks)} chunks")
+            logger.info("✅ Successfully ingested %d chunks", total)
             
         except Exception as e:
-            logger.error(f"Failed to ingest chunks: {e}")
+            logger.error("Failed to ingest chunks: %s", e)
             raise
@@ -1,22 +1,63 @@
 import numpy as np
+from collections import defaultdict, deque
+from itertools import islice
 from typing import List, Dict, Optional
-from sklearn.metrics.pairwise import cosine_similarity
+
+# Optional: FAISS does SIMD inner-product top-k; without it we use a numpy matvec
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Above IVFPQ_MIN_CHUNKS, FAISS uses an IVF index with 8-bit product-quantized
+# codes (PQ_M bytes per vector) instead of scanning every float32 row
+IVFPQ_MIN_CHUNKS = 1000
+IVF_NLIST = 64
+IVF_NPROBE = 8
+PQ_M = 16
 
 class InMemoryGraphRAG:
     def __init__(self):
         self.chunks = []
-        self.embeddings = []
+        self.embeddings = None  # Contiguous float32 matrix of L2-normalized rows
         self.chunk_index = {}
+        self.by_file = defaultdict(list)  # file_name -> chunk_ids, in insertion order
+        self.index = None  # FAISS index over normalized embeddings (when faiss is installed)
     
     def create_chunk_nodes(self, chunks: List[Dict]):
         """Store chunks in memory with their embeddings"""
         for idx, chunk in enumerate(chunks):
             chunk['chunk_id'] = idx
             self.chunks.append(chunk)
-            self.embeddings.append(chunk['embedding'])
             self.chunk_index[idx] = chunk
+            self.by_file[chunk['file_name']].append(idx)
+        if chunks:
+            self._add_embeddings([chunk['embedding'] for chunk in chunks])
         print(f"✅ Stored {len(chunks)} chunks in memory")
     
+    def _add_embeddings(self, embeddings: List[List[float]]):
+        """Append normalized rows to the embedding matrix and rebuild the FAISS index"""
+        rows = np.ascontiguousarray(np.stack(embeddings), dtype=np.float32)
+        norms = np.linalg.norm(rows, axis=1, keepdims=True)
+        rows /= np.where(norms == 0, 1.0, norms)
+        self.embeddings = rows if self.embeddings is None else np.concatenate([self.embeddings, rows])
+        if faiss is not None:
+            self.index = self._build_faiss_index(self.embeddings)
+    
+    @staticmethod
+    def _build_faiss_index(embeddings: np.ndarray):
+        """Flat inner-product index for small sets, trained IVFPQ for large ones"""
+        n, dim = embeddings.shape
+        if n < IVFPQ_MIN_CHUNKS or dim % PQ_M:
+            index = faiss.IndexFlatIP(dim)
+        else:
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, IVF_NLIST, PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+            index.train(embeddings)
+            index.nprobe = IVF_NPROBE
+        index.add(embeddings)
+        return index
+    
     def link_chunks(self, chunks: List[Dict]):
         """Create relationships between chunks (in-memory)"""
         # Add relationships for chunks from the same file
@@ -30,62 +71,66 @@ class InMemoryGraphRAG:
     
     def get_relevant_chunks(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
         """Find most similar chunks using cosine similarity"""
-        if not self.embeddings:
+        if self.embeddings is None:
             return []
         
-        # Convert to numpy arrays
-        query_emb = np.array(query_embedding).reshape(1, -1)
-        chunk_embs = np.array(self.embeddings)
-        
-        # Calculate cosine similarity
-        similarities = cosine_similarity(query_emb, chunk_embs)[0]
+        # Rows are normalized, so the dot product with the normalized query is cosine similarity
+        query_emb = np.asarray(query_embedding, dtype=np.float32)
+        query_emb = query_emb / (np.linalg.norm(query_emb) or 1.0)
         
-        # Get top-k most similar chunks
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        if self.index is not None:
+            scores, indices = self.index.search(query_emb[None, :], min(top_k, self.index.ntotal))
+            # IVF search can come back short (-1 ids) if the probed lists hold fewer than k
+            found = indices[0] >= 0
+            top_indices, top_scores = indices[0][found], scores[0][found]
+        else:
+            # Single BLAS sgemv over the matrix
+            similarities = self.embeddings @ query_emb
+            
+            # Get top-k most similar chunks: partition in O(N), then sort only the k winners
+            k = min(top_k, len(similarities))
+            top_indices = np.argpartition(-similarities, k - 1)[:k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
+            top_scores = similarities[top_indices]
         
         result_chunks = []
-        for idx in top_indices:
+        for idx, score in zip(top_indices, top_scores):
             chunk = self.chunks[idx].copy()
-            chunk['similarity_score'] = float(similarities[idx])
+            chunk['similarity_score'] = float(score)
             result_chunks.append(chunk)
         
-        print(f"📄 Found {len(result_chunks)} relevant chunks with similarities: {[f'{s:.3f}' for s in similarities[top_indices]]}")
+        print(f"📄 Found {len(result_chunks)} relevant chunks with similarities: {[f'{s:.3f}' for s in top_scores]}")
         return result_chunks
     
     def expand_context(self, chunk_ids: List[int], hops: int = 2) -> List[Dict]:
         """Expand context by following relationships"""
-        expanded_chunks = []
+        expanded_chunks = {}  # chunk_id -> chunk, so each chunk is returned once
         visited = set()
         
-        def expand_recursive(current_ids, remaining_hops):
-            if remaining_hops <= 0:
-                return
+        # Iterative BFS over (chunk_id, remaining_hops)
+        queue = deque((chunk_id, hops) for chunk_id in chunk_ids)
+        while queue:
+            chunk_id, remaining_hops = queue.popleft()
+            if remaining_hops <= 0 or chunk_id in visited or chunk_id not in self.chunk_index:
+                continue
+            
+            visited.add(chunk_id)
+            chunk = self.chunk_index[chunk_id]
+            expanded_chunks[chunk_id] = chunk
+            if remaining_hops == 1:
+                continue
+            
+            # Find related chunks
+            next_ids = [rel['target'] for rel in chunk.get('relationships', [])]
+            
+            # Also add chunks from the same file (simple relationship)
+            same_file_chunks = (cid for cid in self.by_file[chunk['file_name']] if cid not in visited)
+            next_ids.extend(islice(same_file_chunks, 2))  # Limit to avoid too many
             
-            for chunk_id in current_ids:
-                if chunk_id in visited or chunk_id not in self.chunk_index:
-                    continue
-                
-                visited.add(chunk_id)
-                chunk = self.chunk_index[chunk_id]
-                expanded_chunks.append(chunk)
-                
-                # Find related chunks
-                next_ids = []
-                if 'relationships' in chunk:
-                    for rel in chunk['relationships']:
-                        next_ids.append(rel['target'])
-                
-                # Also add chunks from the same file (simple relationship)
-                same_file_chunks = [c['chunk_id'] for c in self.chunks 
-                                  if c['file_name'] == chunk['file_name'] and c['chunk_id'] not in visited]
-                next_ids.extend(same_file_chunks[:2])  # Limit to avoid too many
-                
-                if next_ids and remaining_hops > 1:
-                    expand_recursive(next_ids, remaining_hops - 1)
+            queue.extend((next_id, remaining_hops - 1) for next_id in next_ids)
         
-        expand_recursive(chunk_ids, hops)
         print(f"📖 Expanded to {len(expanded_chunks)} chunks total")
-        return expanded_chunks
+        return list(expanded_chunks.values())
     
     def close(self):
         """No-op for compatibility with Neo4j interface"""
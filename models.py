@@ -1,5 +1,5 @@
 from typing import List, Optional, Union
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from enum import Enum
 
 class TestType(str, Enum):
@@ -22,6 +22,9 @@ class TestStep(BaseModel):
     expected_result: str
 
 class TestCase(BaseModel):
+    # Enums are stored as their string values, so serialization needs no coercion
+    model_config = ConfigDict(use_enum_values=True)
+    
     title: str
     summary: str
     test_type: TestType
@@ -37,6 +40,8 @@ class TestCase(BaseModel):
     components: List[str] = []
 
 class TestSuite(BaseModel):
+    model_config = ConfigDict(use_enum_values=True)
+    
     query: str
     test_cases: List[TestCase]
     total_count: int
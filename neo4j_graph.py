@@ -5,10 +5,62 @@ Supports both Desktop (local) and Aura (cloud) connections
 from neo4j import GraphDatabase
 from typing import List, Dict, Optional
 import logging
+from embedding import to_list
+from chunk_ids import assign_chunk_id, text_hash
 from config import NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE, NEO4J_MODE
 
 logger = logging.getLogger(__name__)
 
+WRITE_BATCH = 1000  # Rows per UNWIND statement
+SEMANTIC_NEIGHBOURS = 10  # Nearest chunks considered for SEMANTICALLY_SIMILAR edges
+SEMANTIC_THRESHOLD = 0.8  # Minimum cosine similarity for a SEMANTICALLY_SIMILAR edge
+MAX_EXPANSION_HOPS = 3  # Upper bound on expand_context traversal depth
+
+CREATE_CHUNKS_QUERY = """
+    UNWIND $rows AS row
+    MERGE (c:Chunk {chunk_id: row.chunk_id})
+    REMOVE c.text, c.text_sha1
+    SET c.text_hash = row.text_hash,
+        c.file_name = row.file_name,
+        c.section_title = row.section_title,
+        c.doc_type = row.doc_type
+    // Stores the embedding in the vector-index-compatible float32 representation
+    CALL db.create.setNodeVectorProperty(c, 'embedding', row.embedding)
+    
+    MERGE (d:Document {name: row.file_name})
+    SET d.doc_type = row.doc_type
+    
+    MERGE (c)-[:BELONGS_TO]->(d)
+"""
+
+LINK_SECTIONS_QUERY = """
+    UNWIND $pairs AS p
+    MATCH (c1:Chunk {chunk_id: p.a})
+    MATCH (c2:Chunk {chunk_id: p.b})
+    MERGE (c1)-[:NEXT_SECTION]->(c2)
+"""
+
+DELETE_CHUNKS_QUERY = """
+    UNWIND $ids AS id
+    MATCH (c:Chunk {chunk_id: id})
+    DETACH DELETE c
+"""
+
+# The vector index reports cosine as (1 + cos) / 2; edges store the raw cosine
+SEMANTIC_NEIGHBOURS_QUERY = """
+    MATCH (c1:Chunk)
+    CALL db.index.vector.queryNodes('chunk_embeddings', $k, c1.embedding)
+    YIELD node AS c2, score
+    WITH c1, c2, 2 * score - 1 AS similarity
+    WHERE c2 <> c1 AND c1.file_name <> c2.file_name AND similarity > $threshold
+    MERGE (c1)-[:SEMANTICALLY_SIMILAR {similarity: similarity}]->(c2)
+"""
+
+def _bulk_write(tx, query: str, key: str, rows: List[Dict]):
+    """Transaction function: run an UNWIND query over rows, WRITE_BATCH rows per statement"""
+    for start in range(0, len(rows), WRITE_BATCH):
+        tx.run(query, {key: rows[start:start + WRITE_BATCH]}).consume()
+
 class Neo4jGraphRAG:
     def __init__(self):
         """Initialize Neo4j connection - supports both Desktop and Aura"""
@@ -53,6 +105,14 @@ class Neo4jGraphRAG:
                 CREATE CONSTRAINT document_name_unique IF NOT EXISTS 
                 FOR (d:Document) REQUIRE d.name IS UNIQUE
             """)
+            
+            # Index the fixed-width text hash used for duplicate detection
+            # (text_hash replaced the older text_sha1 property and its index)
+            session.run("DROP INDEX chunk_text_sha1 IF EXISTS")
+            session.run("""
+                CREATE INDEX chunk_text_hash IF NOT EXISTS
+                FOR (c:Chunk) ON (c.text_hash)
+            """)
             print("✅ Neo4j constraints created")
 
     def _create_vector_index(self):
@@ -73,83 +133,94 @@ class Neo4jGraphRAG:
                 logger.warning(f"Vector index creation warning: {e}")
 
     def create_chunk_nodes(self, chunks: List[Dict]):
-        """Create chunk nodes in Neo4j"""
+        """Create chunk nodes in Neo4j
+        
+        Chunk text is not stored on the node (Qdrant's payload holds it); only
+        its hash is kept, for duplicate detection. Nodes are written with one
+        UNWIND statement per WRITE_BATCH chunks, all in one transaction.
+        """
+        rows = [{
+            'chunk_id': assign_chunk_id(chunk),
+            'text_hash': chunk.get('text_hash') or text_hash(chunk['text']),
+            'file_name': chunk['file_name'],
+            'section_title': chunk.get('section_title', ''),
+            'doc_type': chunk.get('doc_type', 'UNKNOWN'),
+            'embedding': to_list(chunk['embedding'])
+        } for chunk in chunks]
+        # All rows commit in one transaction
         with self.driver.session() as session:
-            for chunk in chunks:
-                session.run("""
-                    MERGE (c:Chunk {chunk_id: $chunk_id})
-                    SET c.text = $text,
-                        c.file_name = $file_name,
-                        c.section_title = $section_title,
-                        c.doc_type = $doc_type,
-                        c.embedding = $embedding
-                    
-                    MERGE (d:Document {name: $file_name})
-                    SET d.doc_type = $doc_type
-                    
-                    MERGE (c)-[:BELONGS_TO]->(d)
-                """, 
-                    chunk_id=chunk.get('chunk_id', hash(chunk['text'])),
-                    text=chunk['text'],
-                    file_name=chunk['file_name'],
-                    section_title=chunk.get('section_title', ''),
-                    doc_type=chunk.get('doc_type', 'UNKNOWN'),
-                    embedding=chunk['embedding']
-                )
+            session.execute_write(_bulk_write, CREATE_CHUNKS_QUERY, 'rows', rows)
         print(f"✅ Created {len(chunks)} chunk nodes in Neo4j")
 
-    def link_chunks(self, chunks: List[Dict]):
-        """Create relationships between chunks"""
+    def link_chunks(self, chunks: List[Dict], semantic: bool = True):
+        """Create relationships between chunks (semantic=False skips the graph-wide similarity pass)"""
+        # Create sequential relationships within documents in one transaction
+        pairs = [
+            {'a': assign_chunk_id(chunks[i]), 'b': assign_chunk_id(chunks[i + 1])}
+            for i in range(len(chunks) - 1)
+            if chunks[i]['file_name'] == chunks[i + 1]['file_name']
+        ]
         with self.driver.session() as session:
-            # Create sequential relationships within documents
-            for i in range(len(chunks) - 1):
-                if chunks[i]['file_name'] == chunks[i + 1]['file_name']:
-                    session.run("""
-                        MATCH (c1:Chunk {chunk_id: $chunk_id1})
-                        MATCH (c2:Chunk {chunk_id: $chunk_id2})
-                        MERGE (c1)-[:NEXT_SECTION]->(c2)
-                    """,
-                        chunk_id1=chunks[i].get('chunk_id', hash(chunks[i]['text'])),
-                        chunk_id2=chunks[i + 1].get('chunk_id', hash(chunks[i + 1]['text']))
-                    )
-            
-            # Create semantic relationships based on similarity
+            session.execute_write(_bulk_write, LINK_SECTIONS_QUERY, 'pairs', pairs)
+        
+        # Create semantic relationships based on similarity
+        if semantic:
             self._create_semantic_relationships()
         print("✅ Created relationships between chunks in Neo4j")
 
+    def build_semantic_links(self):
+        """Create SEMANTICALLY_SIMILAR edges across the whole graph
+        
+        Used after a bulk load whose link_chunks calls passed semantic=False,
+        so the graph-wide pass runs once instead of per batch.
+        """
+        self._create_semantic_relationships()
+
     def _create_semantic_relationships(self):
-        """Create semantic relationships between similar chunks"""
+        """Create semantic relationships between similar chunks
+        
+        Candidates come from the chunk_embeddings vector index (top
+        SEMANTIC_NEIGHBOURS per chunk) rather than comparing every pair; the
+        all-pairs comparison is kept as a fallback when the index is unavailable.
+        """
+        params = dict(k=SEMANTIC_NEIGHBOURS + 1, threshold=SEMANTIC_THRESHOLD)  # +1: a chunk finds itself
         with self.driver.session() as session:
-            # Find semantically similar chunks and create relationships
-            session.run("""
-                MATCH (c1:Chunk), (c2:Chunk)
-                WHERE c1 <> c2 AND c1.file_name <> c2.file_name
-                WITH c1, c2, 
-                     gds.similarity.cosine(c1.embedding, c2.embedding) AS similarity
-                WHERE similarity > 0.8
-                MERGE (c1)-[:SEMANTICALLY_SIMILAR {similarity: similarity}]->(c2)
-            """)
+            try:
+                session.execute_write(lambda tx: tx.run(SEMANTIC_NEIGHBOURS_QUERY, params).consume())
+            except Exception as e:
+                logger.warning("Vector index neighbour search failed (%s), comparing all chunk pairs", e)
+                # Find semantically similar chunks and create relationships
+                session.execute_write(lambda tx: tx.run("""
+                    MATCH (c1:Chunk), (c2:Chunk)
+                    WHERE c1 <> c2 AND c1.file_name <> c2.file_name
+                    WITH c1, c2, 
+                         gds.similarity.cosine(c1.embedding, c2.embedding) AS similarity
+                    WHERE similarity > $threshold
+                    MERGE (c1)-[:SEMANTICALLY_SIMILAR {similarity: similarity}]->(c2)
+                """, params).consume())
 
     def get_relevant_chunks(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
-        """Find most similar chunks using vector search"""
+        """Find most similar chunks using vector search
+        
+        Like expand_context, results carry no text (nodes only keep its hash);
+        fetch it from Qdrant by chunk_id, as IntegratedGraphRAG does.
+        """
         with self.driver.session() as session:
             result = session.run("""
                 CALL db.index.vector.queryNodes('chunk_embeddings', $top_k, $query_embedding)
                 YIELD node, score
                 RETURN node.chunk_id as chunk_id, 
-                       node.text as text,
                        node.file_name as file_name,
                        node.section_title as section_title,
                        node.doc_type as doc_type,
                        score
                 ORDER BY score DESC
-            """, top_k=top_k, query_embedding=query_embedding)
+            """, top_k=top_k, query_embedding=to_list(query_embedding))
             
             chunks = []
             for record in result:
                 chunks.append({
                     'chunk_id': record['chunk_id'],
-                    'text': record['text'],
                     'file_name': record['file_name'],
                     'section_title': record['section_title'],
                     'doc_type': record['doc_type'],
@@ -159,35 +230,68 @@ class Neo4jGraphRAG:
             print(f"📄 Found {len(chunks)} relevant chunks from Neo4j")
             return chunks
 
-    def expand_context(self, chunk_ids: List[int], hops: int = 2) -> List[Dict]:
-        """Expand context by following relationships"""
+    def expand_context(self, chunk_ids: List[str], hops: int = 2,
+                       seed_scores: Optional[Dict[str, float]] = None,
+                       decay: float = 0.8, cap: Optional[int] = None) -> List[Dict]:
+        """Expand context by following relationships
+        
+        Each related chunk is scored server-side as its best seed score times the
+        similarities along the path (1.0 for unscored relationships) times
+        decay^hops, and results come back sorted by that score (at most cap).
+        Only NEXT_SECTION and SEMANTICALLY_SIMILAR edges are followed (not
+        BELONGS_TO through Document nodes), for at most MAX_EXPANSION_HOPS hops.
+        With APOC, traversal is a pruned BFS (apoc.path.spanningTree) that stops
+        after cap paths per seed; otherwise a variable-length MATCH is used.
+        """
+        hops = max(1, min(int(hops), MAX_EXPANSION_HOPS))
+        seed_scores = seed_scores or {}
+        seeds = [{"chunk_id": cid, "score": seed_scores.get(cid, 1.0)} for cid in chunk_ids]
+        score_and_return = """
+            WITH related,
+                 max(seed.score
+                     * reduce(s = 1.0, r IN relationships(path) | s * coalesce(r.similarity, 1.0))
+                     * $decay ^ length(path)) AS similarity_score
+            RETURN related.chunk_id as chunk_id,
+                   related.file_name as file_name,
+                   related.section_title as section_title,
+                   related.doc_type as doc_type,
+                   similarity_score
+            ORDER BY similarity_score DESC
+        """ + (" LIMIT $cap" if cap is not None else "")
+        params = dict(seeds=seeds, decay=decay, cap=cap, hops=hops)
+        
         with self.driver.session() as session:
-            # Construct query with literal hop value since Neo4j doesn't support parameters in path patterns
-            query = f"""
-                MATCH (start:Chunk)
-                WHERE start.chunk_id IN $chunk_ids
-                MATCH path = (start)-[*1..{hops}]-(related:Chunk)
-                RETURN DISTINCT related.chunk_id as chunk_id,
-                       related.text as text,
-                       related.file_name as file_name,
-                       related.section_title as section_title,
-                       related.doc_type as doc_type
-            """
-            result = session.run(query, chunk_ids=chunk_ids)
-            
-            chunks = []
-            for record in result:
-                chunks.append({
-                    'chunk_id': record['chunk_id'],
-                    'text': record['text'],
-                    'file_name': record['file_name'],
-                    'section_title': record['section_title'],
-                    'doc_type': record['doc_type']
-                })
+            try:
+                chunks = session.run("""
+                    UNWIND $seeds AS seed
+                    MATCH (start:Chunk {chunk_id: seed.chunk_id})
+                    CALL apoc.path.spanningTree(start, {
+                        relationshipFilter: 'NEXT_SECTION|SEMANTICALLY_SIMILAR',
+                        minLevel: 1, maxLevel: $hops, limit: coalesce($cap, -1)
+                    })
+                    YIELD path
+                    WITH seed, path, last(nodes(path)) AS related
+                    WHERE related:Chunk
+                """ + score_and_return, **params).data()
+            except Exception as e:
+                logger.debug("APOC expansion unavailable (%s), using variable-length match", e)
+                # Literal hop value since Neo4j doesn't support parameters in path
+                # patterns; hops is clamped, so at most MAX_EXPANSION_HOPS plans are cached
+                chunks = session.run(f"""
+                    UNWIND $seeds AS seed
+                    MATCH (start:Chunk {{chunk_id: seed.chunk_id}})
+                    MATCH path = (start)-[:NEXT_SECTION|SEMANTICALLY_SIMILAR*1..{hops}]-(related:Chunk)
+                """ + score_and_return, **params).data()
             
             print(f"📖 Expanded to {len(chunks)} chunks total from Neo4j")
             return chunks
 
+    def delete_chunks(self, chunk_ids: List[str]):
+        """Delete chunk nodes (and their relationships) by chunk_id, in one transaction"""
+        with self.driver.session() as session:
+            session.execute_write(_bulk_write, DELETE_CHUNKS_QUERY, 'ids', list(chunk_ids))
+        print(f"✅ Deleted {len(chunk_ids)} chunk nodes from Neo4j")
+
     def close(self):
         """Close Neo4j connection"""
         if self.driver:
@@ -2,22 +2,141 @@
 Qdrant vector database operations for embedding storage
 Supports both Docker (local) and Cloud (remote) modes
 """
-from qdrant_client import QdrantClient
+import asyncio
+from contextlib import contextmanager
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
 import logging
-import uuid
+import time
+import numpy as np
+import xxhash
+from cachetools import TTLCache
+from background_loop import BackgroundLoop
+from embedding import to_list
+from chunk_ids import assign_chunk_id, text_hash
 from config import (
     QDRANT_MODE, QDRANT_URL, QDRANT_API_KEY, 
-    QDRANT_HOST, QDRANT_PORT, QDRANT_COLLECTION_NAME
+    QDRANT_HOST, QDRANT_PORT, QDRANT_GRPC_PORT, QDRANT_PREFER_GRPC, QDRANT_COLLECTION_NAME,
+    HNSW_M, HNSW_EF_CONSTRUCT, HNSW_EF
 )
 
 logger = logging.getLogger(__name__)
 
+# Store vectors as int8 in RAM (4x smaller); originals stay on disk for rescoring
+QUANTIZATION_CONFIG = models.ScalarQuantization(
+    scalar=models.ScalarQuantizationConfig(
+        type=models.ScalarType.INT8,
+        quantile=0.99,
+        always_ram=True
+    )
+)
+# Payload fields filtered on, indexed so filters are keyed lookups instead of scans
+PAYLOAD_INDEXES = {
+    "text_hash": models.PayloadSchemaType.KEYWORD,
+    "file_name": models.PayloadSchemaType.KEYWORD,
+    "doc_type": models.PayloadSchemaType.KEYWORD,
+}
+
+UPSERT_BATCH = 32  # Points per upsert request (throughput peaks around 32)
+UPSERT_POOL_SIZE = 100  # HTTP connections for concurrent upserts
+UPSERT_WORKERS = 16  # Coroutines draining the upsert queue
+UPSERT_QUEUE_SIZE = 64  # Batches built ahead of the upsert workers
+DEFAULT_INDEXING_THRESHOLD = 20000  # Qdrant's default (KB of unindexed vectors per segment)
+
+# Repeated searches (same vector and parameters) are answered from memory for a
+# short while; the cache is dropped whenever points are written
+SEARCH_CACHE_SIZE = 512
+SEARCH_CACHE_TTL = 120  # seconds
+# Rephrased queries land close to an earlier query vector: reuse that query's
+# results when the cosine similarity clears SEMANTIC_CACHE_THRESHOLD and the
+# entry is younger than SEARCH_CACHE_TTL (points may be written by other processes)
+SEMANTIC_CACHE_SIZE = 1024  # Oldest entries are evicted first
+SEMANTIC_CACHE_THRESHOLD = 0.97
+
+# Collections already set up (created, quantized, payload-indexed) by an earlier
+# run; listed here, startup only confirms they still exist with one
+# collection_exists call instead of redoing the setup checks
+COLLECTION_FLAG_FILE = ".qdrant_collections_verified"
+
+HNSW_CONFIG = models.HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT)
+
+def _search_params(hnsw_ef: int = HNSW_EF) -> models.SearchParams:
+    """Search the int8 vectors with 2x oversampling, then rescore with full precision"""
+    return models.SearchParams(
+        hnsw_ef=hnsw_ef,
+        exact=False,
+        quantization=models.QuantizationSearchParams(rescore=True, oversampling=2.0)
+    )
+
+SEARCH_PARAMS = _search_params()
+
+def _similar_pairs(X: np.ndarray, threshold: float, block: int = 512) -> Iterator[Tuple[int, int]]:
+    """Yield (i, j), i < j, for rows of the L2-normalized matrix X whose dot product exceeds threshold.
+    
+    Works in block x block tiles of X @ X.T so memory stays bounded and each
+    tile is a single BLAS matmul. Every pair (k, i) is yielded before any
+    pair (i, j), so callers can resolve duplicate groups greedily.
+    """
+    n = X.shape[0]
+    for r0 in range(0, n, block):
+        rows = X[r0:r0 + block]
+        for c0 in range(r0, n, block):
+            sims = rows @ X[c0:c0 + block].T
+            ii, jj = np.nonzero(sims > threshold)
+            ii += r0
+            jj += c0
+            upper = ii < jj
+            for i, j in zip(ii[upper].tolist(), jj[upper].tolist()):
+                yield i, j
+
+def _collection_key(collection_name: str) -> str:
+    """Identifies a collection on a specific Qdrant deployment"""
+    location = QDRANT_URL if QDRANT_MODE == "cloud" else f"{QDRANT_HOST}:{QDRANT_PORT}"
+    return f"{QDRANT_MODE}|{location}|{collection_name}"
+
+def _verified_collections() -> set:
+    try:
+        with open(COLLECTION_FLAG_FILE, encoding="utf-8") as f:
+            return set(f.read().splitlines())
+    except OSError:
+        return set()
+
+def _set_collection_verified(collection_name: str, verified: bool = True):
+    keys = _verified_collections()
+    if verified:
+        keys.add(_collection_key(collection_name))
+    else:
+        keys.discard(_collection_key(collection_name))
+    try:
+        with open(COLLECTION_FLAG_FILE, "w", encoding="utf-8") as f:
+            f.write("\n".join(sorted(keys)))
+    except OSError as e:
+        logger.warning("Could not update %s: %s", COLLECTION_FLAG_FILE, e)
+
 class QdrantVectorStore:
-    def __init__(self):
-        """Initialize Qdrant client - supports both Docker and Cloud modes"""
+    _instance: Optional["QdrantVectorStore"] = None
+    
+    @classmethod
+    def get(cls) -> "QdrantVectorStore":
+        """Shared store for this process, connected on first use"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+    
+    def __init__(self, prefer_grpc: bool = QDRANT_PREFER_GRPC, upsert_batch: int = UPSERT_BATCH,
+                 pool_size: int = UPSERT_POOL_SIZE):
+        """Initialize Qdrant client - supports both Docker and Cloud modes
+        
+        prefer_grpc, upsert_batch and pool_size tune bulk-write throughput per deployment.
+        """
+        self.upsert_batch = upsert_batch
+        self._search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self._qcache_vecs = None  # [N, dim] float32, L2-normalized query vectors
+        self._qcache_keys = []  # (top_k, score_threshold, hnsw_ef) per row
+        self._qcache_results = []
+        self._qcache_times = []  # time.monotonic() each row was stored
         try:
             if QDRANT_MODE == "cloud":
                 # Qdrant Cloud mode
@@ -26,25 +145,36 @@ class QdrantVectorStore:
                 if not QDRANT_API_KEY:
                     raise ValueError("QDRANT_API_KEY is required for cloud mode")
                 
-                self.client = QdrantClient(
-                    url=QDRANT_URL,
-                    api_key=QDRANT_API_KEY,
-                )
+                connection = dict(url=QDRANT_URL, api_key=QDRANT_API_KEY,
+                                  prefer_grpc=prefer_grpc, grpc_port=QDRANT_GRPC_PORT)
+                self.client = QdrantClient(**connection)
                 print(f"✅ Connected to Qdrant Cloud: {QDRANT_URL}")
                 
             else:
                 # Docker mode (local)
-                self.client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+                connection = dict(host=QDRANT_HOST, port=QDRANT_PORT,
+                                  prefer_grpc=prefer_grpc, grpc_port=QDRANT_GRPC_PORT)
+                self.client = QdrantClient(**connection)
                 print(f"✅ Connected to Qdrant Docker: {QDRANT_HOST}:{QDRANT_PORT}")
             
+            # Async client for concurrent bulk upserts, driven from its own event loop
+            self.aclient = AsyncQdrantClient(**connection, pool_size=pool_size, timeout=60)
+            self._loop = BackgroundLoop("qdrant-upsert")
+            
             self.collection_name = QDRANT_COLLECTION_NAME
             
-            # Test connection and get collections
-            collections = self.client.get_collections()
+            # One cheap existence check per process (it also tests the connection):
+            # a collection dropped or a server reset since the flag was written
+            # invalidates the flag and the collection is set up again
+            exists = self.client.collection_exists(collection_name=self.collection_name)
             print(f"✅ Qdrant connection successful ({QDRANT_MODE} mode)")
-            
-            # Create collection if it doesn't exist
-            self._create_collection()
+            if exists and _collection_key(self.collection_name) in _verified_collections():
+                print(f"✅ Using verified Qdrant collection: {self.collection_name}")
+            else:
+                _set_collection_verified(self.collection_name, False)
+                # Create collection if it doesn't exist
+                self._create_collection()
+                _set_collection_verified(self.collection_name)
             
         except Exception as e:
             if QDRANT_MODE == "cloud":
@@ -59,141 +189,358 @@ class QdrantVectorStore:
         """Create collection for document chunks"""
         try:
             # Check if collection exists
-            collections = self.client.get_collections().collections
-            collection_names = [col.name for col in collections]
-            
-            if self.collection_name not in collection_names:
+            if not self.client.collection_exists(collection_name=self.collection_name):
                 self.client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=768,  # Gemini embedding dimension
                         distance=Distance.COSINE
-                    )
+                    ),
+                    hnsw_config=HNSW_CONFIG,
+                    quantization_config=QUANTIZATION_CONFIG
                 )
                 print(f"✅ Created Qdrant collection: {self.collection_name}")
             else:
                 print(f"✅ Qdrant collection already exists: {self.collection_name}")
+                self._enable_quantization()
+            
+            self._create_payload_indexes()
                 
         except Exception as e:
             logger.error(f"Failed to create collection: {e}")
             raise
 
-    def store_embeddings(self, chunks: List[Dict]):
-        """Store chunk embeddings in Qdrant"""
-        points = []
-        
-        for i, chunk in enumerate(chunks):
-            point_id = chunk.get('chunk_id', i)
-            
-            # Create point for Qdrant
-            point = PointStruct(
-                id=point_id,
-                vector=chunk['embedding'],
-                payload={
-                    'text': chunk['text'],
-                    'file_name': chunk['file_name'],
-                    'section_title': chunk.get('section_title', ''),
-                    'doc_type': chunk.get('doc_type', 'UNKNOWN'),
-                    'chunk_id': point_id
-                }
+    def _enable_quantization(self):
+        """Turn on int8 scalar quantization for a collection created without it"""
+        info = self.client.get_collection(collection_name=self.collection_name)
+        if info.config.quantization_config is None:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                quantization_config=QUANTIZATION_CONFIG
             )
-            points.append(point)
-        
-        # Batch upsert points
-        batch_size = 100
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
-            self.client.upsert(
+            print(f"✅ Enabled int8 quantization on {self.collection_name}")
+
+    def _create_payload_indexes(self):
+        """Index the payload fields used in filters (no-op for fields already indexed)"""
+        indexed = self.client.get_collection(collection_name=self.collection_name).payload_schema or {}
+        for field_name, schema in PAYLOAD_INDEXES.items():
+            if field_name not in indexed:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=schema
+                )
+
+    def store_embeddings(self, chunks: List[Dict]):
+        """Store chunk embeddings in Qdrant with concurrent async upserts (store_embeddings_async)"""
+        self._clear_search_caches()
+        self._loop.run(self.store_embeddings_async(chunks))
+
+    def _clear_search_caches(self):
+        """Forget cached search results (called whenever points change)"""
+        self._search_cache.clear()
+        self._qcache_vecs = None
+        self._qcache_keys = []
+        self._qcache_results = []
+        self._qcache_times = []
+
+    def _semantic_lookup(self, query: np.ndarray, params: tuple) -> Optional[List[Dict]]:
+        """Results of the closest unexpired cached query with the same parameters, if similar enough"""
+        if self._qcache_vecs is None or self._qcache_vecs.shape[1] != query.shape[0]:
+            return None
+        sims = self._qcache_vecs @ query
+        oldest = time.monotonic() - SEARCH_CACHE_TTL
+        for row in np.argsort(-sims):
+            if sims[row] < SEMANTIC_CACHE_THRESHOLD:
+                break
+            if self._qcache_keys[row] == params and self._qcache_times[row] >= oldest:
+                return self._qcache_results[row]
+        return None
+
+    def _semantic_store(self, query: np.ndarray, params: tuple, chunks: List[Dict]):
+        """Append a query to the semantic cache, dropping the oldest rows past SEMANTIC_CACHE_SIZE"""
+        if self._qcache_vecs is None or self._qcache_vecs.shape[1] != query.shape[0]:
+            # First entry, or the embedding model changed dimension: start over
+            self._qcache_vecs, self._qcache_keys, self._qcache_results = query[None, :], [params], [chunks]
+            self._qcache_times = [time.monotonic()]
+            return
+        keep = SEMANTIC_CACHE_SIZE - 1
+        self._qcache_vecs = np.vstack([self._qcache_vecs[-keep:], query])
+        self._qcache_keys = self._qcache_keys[-keep:] + [params]
+        self._qcache_results = self._qcache_results[-keep:] + [chunks]
+        self._qcache_times = self._qcache_times[-keep:] + [time.monotonic()]
+
+    @staticmethod
+    def _payload(chunk: Dict) -> Dict:
+        """Qdrant payload stored alongside a chunk's vector (the chunk_id is the point id)"""
+        return {
+            'text': chunk['text'],
+            'file_name': chunk['file_name'],
+            'section_title': chunk.get('section_title', ''),
+            'doc_type': chunk.get('doc_type', 'UNKNOWN'),
+            'text_hash': chunk.get('text_hash') or text_hash(chunk['text'])
+        }
+
+    @contextmanager
+    def bulk_ingest(self):
+        """Pause HNSW indexing while a bulk load runs, so the graph is built once afterwards"""
+        config = self.client.get_collection(collection_name=self.collection_name).config
+        # None means the server default, which has to be restored explicitly
+        threshold = config.optimizer_config.indexing_threshold or DEFAULT_INDEXING_THRESHOLD
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0)
+        )
+        try:
+            yield
+        finally:
+            self.client.update_collection(
                 collection_name=self.collection_name,
-                points=batch
+                optimizers_config=models.OptimizersConfigDiff(indexing_threshold=threshold)
             )
+
+    async def store_embeddings_async(self, chunks: List[Dict]):
+        """Store chunk embeddings in Qdrant through a queue of upsert batches
+        
+        A producer builds PointStruct batches onto a bounded queue while
+        UPSERT_WORKERS consumers upsert them concurrently. Each upsert waits for
+        the server to apply it (wait=True), so every point is searchable once
+        this returns.
+        """
+        queue = asyncio.Queue(maxsize=UPSERT_QUEUE_SIZE)
+        
+        async def produce():
+            for start in range(0, len(chunks), self.upsert_batch):
+                batch = chunks[start:start + self.upsert_batch]
+                # Cast the batch to float32 once and convert it to lists in one call
+                vectors = np.asarray([chunk['embedding'] for chunk in batch], dtype=np.float32).tolist()
+                await queue.put([
+                    PointStruct(
+                        id=assign_chunk_id(chunk),
+                        vector=vector,
+                        payload=self._payload(chunk)
+                    )
+                    for chunk, vector in zip(batch, vectors)
+                ])
+            for _ in range(UPSERT_WORKERS):
+                await queue.put(None)  # One stop marker per consumer
+        
+        async def consume():
+            while (batch := await queue.get()) is not None:
+                await self.aclient.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                    wait=True
+                )
+        
+        tasks = [asyncio.ensure_future(produce())]
+        tasks += [asyncio.ensure_future(consume()) for _ in range(UPSERT_WORKERS)]
+        try:
+            await asyncio.gather(*tasks)
+        except Exception:
+            # Don't leave the producer blocked on a full queue after a failed upsert
+            for task in tasks:
+                task.cancel()
+            raise
         
-        print(f"✅ Stored {len(chunks)} embeddings in Qdrant")
+        logger.info("Stored %d embeddings in %d batches", len(chunks), -(-len(chunks) // self.upsert_batch))
 
-    def search_similar(self, query_embedding: List[float], top_k: int = 5, score_threshold: float = 0.7) -> List[Dict]:
-        """Search for similar chunks using vector similarity"""
+    def search_similar(self, query_embedding: List[float], top_k: int = 5, score_threshold: float = 0.7,
+                       hnsw_ef: Optional[int] = None) -> List[Dict]:
+        """Search for similar chunks using vector similarity (hnsw_ef overrides HNSW_EFS per call)"""
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        key = (xxhash.xxh64(query_vector.tobytes()).intdigest(), top_k, score_threshold, hnsw_ef)
+        params = key[1:]
+        normalized = query_vector / (np.linalg.norm(query_vector) or 1.0)
+        cached = self._search_cache.get(key)
+        if cached is None:
+            cached = self._semantic_lookup(normalized, params)
+        if cached is not None:
+            # Chunks are flat dicts, so copying each one keeps callers off the cached entries
+            return [dict(chunk) for chunk in cached]
+        
+        search_params = SEARCH_PARAMS if hnsw_ef is None else _search_params(hnsw_ef)
         try:
-            search_result = self.client.search(
+            search_result = self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_embedding,
+                query=query_vector.tolist(),
                 limit=top_k,
                 score_threshold=score_threshold,
+                search_params=search_params,
                 with_payload=True,
                 with_vectors=False
             )
             
-            chunks = []
-            for hit in search_result:
-                chunk = {
-                    'chunk_id': hit.payload['chunk_id'],
-                    'text': hit.payload['text'],
-                    'file_name': hit.payload['file_name'],
-                    'section_title': hit.payload['section_title'],
-                    'doc_type': hit.payload['doc_type'],
-                    'similarity_score': hit.score
-                }
-                chunks.append(chunk)
+            chunks = [self._hit_to_chunk(hit) for hit in search_result.points]
             
-            print(f"📄 Found {len(chunks)} similar chunks from Qdrant")
+            logger.debug("Found %d similar chunks from Qdrant", len(chunks))
+            self._search_cache[key] = [dict(chunk) for chunk in chunks]
+            self._semantic_store(normalized, params, self._search_cache[key])
             return chunks
             
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
 
-    def get_chunk_by_id(self, chunk_id: int) -> Optional[Dict]:
-        """Retrieve a specific chunk by ID"""
+    def search_similar_batch(self, query_embeddings: List[List[float]], top_k: int = 5,
+                             score_threshold: float = 0.7, hnsw_ef: Optional[int] = None) -> List[List[Dict]]:
+        """Search for several query vectors in one request; prefer this to calling
+        search_similar in a loop, since Qdrant runs the batch in parallel server-side.
+        Returns one result list per query, in order."""
+        if not len(query_embeddings):
+            return []
+        search_params = SEARCH_PARAMS if hnsw_ef is None else _search_params(hnsw_ef)
+        requests = [
+            models.QueryRequest(
+                query=to_list(np.asarray(vector, dtype=np.float32)),
+                limit=top_k,
+                score_threshold=score_threshold,
+                params=search_params,
+                with_payload=True,
+                with_vector=False
+            )
+            for vector in query_embeddings
+        ]
         try:
-            result = self.client.retrieve(
+            responses = self.client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        except Exception as e:
+            logger.error("Batch search failed: %s", e)
+            return [[] for _ in query_embeddings]
+        return [[self._hit_to_chunk(hit) for hit in response.points] for response in responses]
+
+    @staticmethod
+    def _hit_to_chunk(hit) -> Dict:
+        """Chunk dict for a scored search hit"""
+        return {
+            'chunk_id': hit.id,
+            'text': hit.payload['text'],
+            'file_name': hit.payload['file_name'],
+            'section_title': hit.payload['section_title'],
+            'doc_type': hit.payload['doc_type'],
+            'similarity_score': hit.score
+        }
+
+    def get_chunks_by_ids(self, ids: List[str]) -> List[Dict]:
+        """Retrieve chunks with their vectors in one request, in the order of ids (missing ids are skipped)"""
+        if not ids:
+            return []
+        try:
+            points = self.client.retrieve(
                 collection_name=self.collection_name,
-                ids=[chunk_id],
+                ids=ids,
                 with_payload=True,
                 with_vectors=True
             )
-            
-            if result:
-                point = result[0]
-                return {
-                    'chunk_id': point.payload['chunk_id'],
-                    'text': point.payload['text'],
-                    'file_name': point.payload['file_name'],
-                    'section_title': point.payload['section_title'],
-                    'doc_type': point.payload['doc_type'],
-                    'embedding': point.vector
-                }
-            return None
-            
         except Exception as e:
             logger.error(f"Retrieval failed: {e}")
-            return None
+            return []
+        
+        by_id = {
+            point.id: {
+                'chunk_id': point.id,
+                'text': point.payload['text'],
+                'file_name': point.payload['file_name'],
+                'section_title': point.payload['section_title'],
+                'doc_type': point.payload['doc_type'],
+                'embedding': point.vector
+            }
+            for point in points
+        }
+        return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
 
-    def get_chunks_by_file(self, file_name: str) -> List[Dict]:
-        """Get all chunks from a specific file"""
+    def get_chunk_by_id(self, chunk_id: str) -> Optional[Dict]:
+        """Retrieve a specific chunk by ID"""
+        chunks = self.get_chunks_by_ids([chunk_id])
+        return chunks[0] if chunks else None
+
+    def get_chunks_bulk(self, ids: List[str]) -> Dict[str, Dict]:
+        """Retrieve payloads for many chunks in one request, keyed by chunk_id"""
+        if not ids:
+            return {}
         try:
-            search_result = self.client.scroll(
+            points = self.client.retrieve(
                 collection_name=self.collection_name,
-                scroll_filter=models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key="file_name",
-                            match=models.MatchValue(value=file_name)
-                        )
-                    ]
-                ),
+                ids=ids,
                 with_payload=True,
                 with_vectors=False
             )
-            
-            chunks = []
-            for point in search_result[0]:  # search_result is (points, next_page_offset)
-                chunk = {
-                    'chunk_id': point.payload['chunk_id'],
+            return {
+                point.id: {
+                    'chunk_id': point.id,
                     'text': point.payload['text'],
                     'file_name': point.payload['file_name'],
                     'section_title': point.payload['section_title'],
                     'doc_type': point.payload['doc_type']
                 }
-                chunks.append(chunk)
+                for point in points
+            }
+        except Exception as e:
+            logger.error("Bulk retrieval failed: %s", e)
+            return {}
+
+    def get_vectors_by_text_hash(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """Stored vectors for chunks whose text hash is already in the collection"""
+        vectors = {}
+        wanted = list(set(hashes))
+        if not wanted:
+            return vectors
+        try:
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="text_hash",
+                                match=models.MatchAny(any=wanted)
+                            )
+                        ]
+                    ),
+                    limit=256,
+                    offset=offset,
+                    with_payload=["text_hash"],
+                    with_vectors=True
+                )
+                for point in points:
+                    vectors.setdefault(point.payload['text_hash'], point.vector)
+                if offset is None:
+                    return vectors
+        except Exception as e:
+            logger.error("Text hash lookup failed: %s", e)
+            return vectors
+
+    def get_chunks_by_file(self, file_name: str) -> List[Dict]:
+        """Get all chunks from a specific file, following scroll pages to the end"""
+        chunks = []
+        try:
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="file_name",
+                                match=models.MatchValue(value=file_name)
+                            )
+                        ]
+                    ),
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False
+                )
+                for point in points:
+                    chunks.append({
+                        'chunk_id': point.id,
+                        'text': point.payload['text'],
+                        'file_name': point.payload['file_name'],
+                        'section_title': point.payload['section_title'],
+                        'doc_type': point.payload['doc_type']
+                    })
+                if offset is None:
+                    break
             
             return chunks
             
@@ -201,14 +548,78 @@ class QdrantVectorStore:
             logger.error(f"File retrieval failed: {e}")
             return []
 
+    def find_duplicate_points(self, score_threshold: float = 0.9995, page_size: int = 256) -> List:
+        """Find near-identical vectors with a blocked cosine scan over all points.
+        
+        Returns the ids to delete; the first point of each duplicate group (in
+        scroll order, i.e. by id) is kept. Point ids are chunk_ids, so the same
+        ids are deleted from Neo4j to keep both stores on the same survivors.
+        """
+        ids = []
+        vectors = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=True
+            )
+            for point in points:
+                ids.append(point.id)
+                vectors.append(point.vector)
+            if offset is None:
+                break
+
+        if len(ids) < 2:
+            return []
+
+        X = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(X, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        X /= norms
+
+        duplicates = set()
+        for i, j in _similar_pairs(X, score_threshold):
+            # i < j: keep the earlier point unless it was itself dropped
+            if i not in duplicates:
+                duplicates.add(j)
+
+        return [ids[k] for k in sorted(duplicates)]
+
+    def delete_points(self, point_ids: List):
+        """Delete points by id"""
+        if not point_ids:
+            return
+        self._clear_search_caches()
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=point_ids)
+        )
+        print(f"✅ Deleted {len(point_ids)} points from Qdrant")
+
     def delete_collection(self):
         """Delete the entire collection"""
+        self._clear_search_caches()
+        _set_collection_verified(self.collection_name, False)
         try:
             self.client.delete_collection(collection_name=self.collection_name)
             print(f"✅ Deleted Qdrant collection: {self.collection_name}")
         except Exception as e:
             logger.error(f"Collection deletion failed: {e}")
 
+    def recreate_collection(self):
+        """Drop the collection and create it empty straight away"""
+        self._clear_search_caches()
+        self.client.delete_collection(collection_name=self.collection_name)
+        print(f"✅ Deleted Qdrant collection: {self.collection_name}")
+        self._create_collection()
+
+    def count_points(self, exact: bool = True) -> int:
+        """Number of points in the collection (exact=False returns a cheap estimate)"""
+        return self.client.count(collection_name=self.collection_name, exact=exact).count
+
     def get_collection_info(self):
         """Get information about the collection"""
         try:
@@ -222,5 +633,9 @@ class QdrantVectorStore:
     def close(self):
         """Close Qdrant connection"""
         if hasattr(self, 'client'):
-            # Qdrant client doesn't need explicit closing
+            # The sync client doesn't need explicit closing; the async one owns a connection pool
+            self._loop.run(self.aclient.close())
+            self._loop.close()
+            if QdrantVectorStore._instance is self:
+                QdrantVectorStore._instance = None
             print("✅ Qdrant connection closed")
@@ -2,89 +2,167 @@
 Enhanced Document Tracker with Section-Level Change Detection
 Tracks changes at paragraph/section level for granular updates
 """
+import logging
+import multiprocessing
 import os
-import json
-import hashlib
-from typing import Dict, List, Set, Tuple
+import msgpack
+import orjson
+import xxhash
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from docx import Document
+from docx_stream import iter_paragraphs
+
+logger = logging.getLogger(__name__)
+
+def extract_sections_with_hashes(filepath: str) -> List[Dict]:
+    """Extract sections from docx with individual hashes"""
+    try:
+        sections = []
+        current_section = {"title": None, "paragraphs": []}
+        parts = []  # Content lines of the current section, joined once when it closes
+        # Change-detection key, not a security boundary: xxh3 fed line by line
+        hasher = xxhash.xxh3_128()
+        
+        def close_section():
+            if parts:
+                current_section["content"] = "".join(parts)
+                current_section["section_id"] = len(sections)
+                current_section["hash"] = hasher.hexdigest()
+                sections.append(current_section)
+        
+        # Streamed straight from the package XML (same style names/text as python-docx)
+        for para_idx, (style_name, text) in enumerate(iter_paragraphs(filepath)):
+            para_text = text.strip()
+            if not para_text:
+                continue
+                
+            # Check if this is a heading (new section)
+            if style_name.startswith("Heading"):
+                # Save previous section if it has content
+                close_section()
+                
+                # Start new section
+                current_section = {"title": para_text, "paragraphs": []}
+                parts = []
+                hasher = xxhash.xxh3_128()
+            
+            line = para_text + "\\n"
+            parts.append(line)
+            hasher.update(line.encode('utf-8'))
+            current_section["paragraphs"].append({
+                "index": para_idx, 
+                "text": para_text
+            })
+        
+        # Don't forget the last section
+        close_section()
+        
+        return sections
+        
+    except Exception as e:
+        print(f"❌ Error extracting sections from {filepath}: {e}")
+        return []
+
+def _cache_record(section: Dict) -> Dict:
+    """Cached form of a section: id, title, hash and paragraph indices"""
+    paragraphs = section.get("paragraphs", [])
+    return {
+        "section_id": section["section_id"],
+        "title": section["title"],
+        "hash": section["hash"],
+        "paragraphs": [p["index"] if isinstance(p, dict) else p for p in paragraphs]
+    }
+
+def _file_stamp(path: str) -> Optional[List[int]]:
+    """[mtime_ns, size] of a document, stored per file to skip re-parsing unchanged ones"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
 
 class SectionTracker:
     """Tracks document changes at section/paragraph level"""
     
-    def __init__(self, cache_file: str = "section_cache.json"):
+    # Parsed caches keyed by (path, (mtime_ns, size)): trackers over an unchanged
+    # file share one dict instead of each unpacking it again
+    _CACHE_MEMO: Dict[Tuple[str, Tuple[int, int]], Dict] = {}
+    
+    def __init__(self, cache_file: str = "section_cache.msgpack"):
         self.cache_file = cache_file
         self.cache = self._load_cache()
+        self._file_stamps = {}  # filename -> [mtime_ns, size] seen by get_changed_sections
+        self._loaded_stamp = self._cache_stamp()
+    
+    def _cache_stamp(self) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of the cache file, to detect writes by other processes"""
+        try:
+            st = os.stat(self.cache_file)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def is_stale(self) -> bool:
+        """True if the cache file changed on disk since this tracker last read or wrote it"""
+        return self._cache_stamp() != self._loaded_stamp
+    
+    def _memo_key(self) -> Optional[Tuple[str, Tuple[int, int]]]:
+        stamp = self._cache_stamp()
+        return None if stamp is None else (os.path.abspath(self.cache_file), stamp)
     
     def _load_cache(self) -> Dict:
         """Load cached section metadata"""
-        if os.path.exists(self.cache_file):
+        key = self._memo_key()
+        if key is not None:
+            cache = self._CACHE_MEMO.get(key)
+            if cache is not None:
+                return cache
             try:
-                with open(self.cache_file, 'r') as f:
-                    return json.load(f)
+                with open(self.cache_file, 'rb') as f:
+                    cache = msgpack.unpackb(f.read(), raw=False)
+                self._CACHE_MEMO[key] = cache
+                return cache
             except Exception as e:
                 print(f"⚠️  Warning: Could not load section cache: {e}")
+        # Migrate a cache left by the older JSON format
+        legacy_file = os.path.splitext(self.cache_file)[0] + ".json"
+        if legacy_file != self.cache_file and os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, 'rb') as f:
+                    return orjson.loads(f.read())
+            except Exception as e:
+                print(f"⚠️  Warning: Could not load legacy section cache: {e}")
         return {"documents": {}, "last_updated": None}
     
     def _save_cache(self):
         """Save section metadata to cache"""
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+            with open(self.cache_file, 'wb') as f:
+                f.write(msgpack.packb(self.cache))
+            self._loaded_stamp = self._cache_stamp()
+            key = self._memo_key()
+            if key is not None:
+                # Only the latest stamp of a file is worth keeping
+                for old in [k for k in self._CACHE_MEMO if k[0] == key[0]]:
+                    del self._CACHE_MEMO[old]
+                self._CACHE_MEMO[key] = self.cache
         except Exception as e:
             print(f"⚠️  Warning: Could not save section cache: {e}")
     
     def _extract_sections_with_hashes(self, filepath: str) -> List[Dict]:
         """Extract sections from docx with individual hashes"""
-        try:
-            doc = Document(filepath)
-            sections = []
-            section_id = 0
-            current_section = {"title": None, "content": "", "paragraphs": []}
-            
-            for para_idx, para in enumerate(doc.paragraphs):
-                para_text = para.text.strip()
-                if not para_text:
-                    continue
-                    
-                # Check if this is a heading (new section)
-                if para.style.name.startswith("Heading"):
-                    # Save previous section if it has content
-                    if current_section["content"].strip():
-                        current_section["section_id"] = section_id
-                        current_section["hash"] = hashlib.md5(
-                            current_section["content"].encode('utf-8')
-                        ).hexdigest()
-                        sections.append(current_section)
-                        section_id += 1
-                    
-                    # Start new section
-                    current_section = {
-                        "title": para_text,
-                        "content": para_text + "\\n",
-                        "paragraphs": [{"index": para_idx, "text": para_text}]
-                    }
-                else:
-                    # Add to current section
-                    current_section["content"] += para_text + "\\n"
-                    current_section["paragraphs"].append({
-                        "index": para_idx, 
-                        "text": para_text
-                    })
-            
-            # Don't forget the last section
-            if current_section["content"].strip():
-                current_section["section_id"] = section_id
-                current_section["hash"] = hashlib.md5(
-                    current_section["content"].encode('utf-8')
-                ).hexdigest()
-                sections.append(current_section)
-            
-            return sections
-            
-        except Exception as e:
-            print(f"❌ Error extracting sections from {filepath}: {e}")
-            return []
+        return extract_sections_with_hashes(filepath)
+    
+    def _extract_all(self, filepaths: List[str]) -> List[List[Dict]]:
+        """Sections for each file, parsed in worker processes when there are several"""
+        workers = min(len(filepaths), os.cpu_count() or 1)
+        if workers <= 1:
+            return [extract_sections_with_hashes(filepath) for filepath in filepaths]
+        # Spawned, not forked: this runs on a worker thread of a process that has
+        # other threads (event loops, DB drivers) whose held locks fork would copy
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return list(pool.map(extract_sections_with_hashes, filepaths))
     
     def get_changed_sections(self, doc_folder: str) -> Dict[str, Dict]:
         """
@@ -98,21 +176,34 @@ class SectionTracker:
             return all_changes
         
         # Process each .docx file
-        for filename in os.listdir(doc_folder):
-            if not filename.endswith(".docx"):
-                continue
-                
-            filepath = os.path.join(doc_folder, filename)
+        with os.scandir(doc_folder) as it:
+            entries = [e for e in it if e.name.endswith(".docx") and e.is_file()]
+        
+        # Files whose stamp matches the cache are unchanged, so skip parsing them
+        to_extract = []
+        for entry in entries:
+            stamp = self._file_stamps[entry.name] = _file_stamp(entry.path)
+            cached = self.cache["documents"].get(entry.name, {})
+            if stamp is not None and cached.get("stamp") == stamp:
+                all_changes[entry.name] = {"new": [], "modified": [], "unchanged": cached["sections"]}
+                print(f"📄 Skipping {entry.name}: not modified since last processing")
+            else:
+                to_extract.append(entry)
+        
+        # Parsing is CPU-bound, so files are extracted in parallel; diffing stays here
+        extracted = self._extract_all([entry.path for entry in to_extract])
+        
+        for entry, current_sections in zip(to_extract, extracted):
+            filename = entry.name
             file_changes = {"new": [], "modified": [], "unchanged": []}
             
-            # Extract current sections
-            current_sections = self._extract_sections_with_hashes(filepath)
             cached_sections = self.cache["documents"].get(filename, {}).get("sections", [])
             
             # Create lookup for cached sections
             cached_lookup = {s["section_id"]: s for s in cached_sections}
             
-            print(f"📄 Analyzing {filename}: {len(current_sections)} sections")
+            # Per-section lines only at DEBUG; each file gets one summary line below
+            verbose = logger.isEnabledFor(logging.DEBUG)
             
             # Check each current section
             for section in current_sections:
@@ -122,15 +213,22 @@ class SectionTracker:
                 if not cached_section:
                     # New section
                     file_changes["new"].append(section)
-                    print(f"   📝 New section {section_id}: {section['title'][:50]}...")
+                    if verbose:
+                        logger.debug("New section %s: %.50s", section_id, section['title'])
                 elif section["hash"] != cached_section["hash"]:
                     # Modified section
                     file_changes["modified"].append(section)
-                    print(f"   🔄 Modified section {section_id}: {section['title'][:50]}...")
+                    if verbose:
+                        logger.debug("Modified section %s: %.50s", section_id, section['title'])
                 else:
                     # Unchanged section
                     file_changes["unchanged"].append(section)
-                    print(f"   ✅ Unchanged section {section_id}: {section['title'][:50]}...")
+                    if verbose:
+                        logger.debug("Unchanged section %s: %.50s", section_id, section['title'])
+            
+            print(f"📄 Analyzed {filename}: {len(current_sections)} sections "
+                  f"({len(file_changes['new'])} new, {len(file_changes['modified'])} modified, "
+                  f"{len(file_changes['unchanged'])} unchanged)")
             
             # Check for deleted sections
             current_ids = {s["section_id"] for s in current_sections}
@@ -148,17 +246,20 @@ class SectionTracker:
         """Mark sections as processed and update cache"""
         if processed_files is None:
             # Mark all files as fully processed
-            processed_files = {}
-            for filename in os.listdir(doc_folder):
-                if filename.endswith(".docx"):
-                    filepath = os.path.join(doc_folder, filename)
-                    sections = self._extract_sections_with_hashes(filepath)
-                    processed_files[filename] = sections
-        
-        # Update cache
+            with os.scandir(doc_folder) as it:
+                entries = [e for e in it if e.name.endswith(".docx") and e.is_file()]
+            extracted = self._extract_all([entry.path for entry in entries])
+            processed_files = {entry.name: sections for entry, sections in zip(entries, extracted)}
+            self._file_stamps.update((entry.name, _file_stamp(entry.path)) for entry in entries)
+        
+        # Update cache (only what change detection needs; content stays out of it)
         for filename, sections in processed_files.items():
+            # Prefer the stamp taken when the sections were read, so an edit made
+            # since then still counts as a change next run
+            stamp = self._file_stamps.pop(filename, None) or _file_stamp(os.path.join(doc_folder, filename))
             self.cache["documents"][filename] = {
-                "sections": sections,
+                "sections": [_cache_record(section) for section in sections],
+                "stamp": stamp,
                 "last_processed": datetime.now().isoformat(),
                 "total_sections": len(sections)
             }
@@ -195,3 +296,13 @@ class SectionTracker:
             "last_updated": self.cache.get("last_updated"),
             "files": files_info
         }
+
+_TRACKER_SINGLETON: Optional[SectionTracker] = None
+
+def get_tracker(cache_file: str = "section_cache.msgpack") -> SectionTracker:
+    """Shared SectionTracker, reloaded only when its cache file changed on disk"""
+    global _TRACKER_SINGLETON
+    tracker = _TRACKER_SINGLETON
+    if tracker is None or tracker.cache_file != cache_file or tracker.is_stale():
+        tracker = _TRACKER_SINGLETON = SectionTracker(cache_file)
+    return tracker
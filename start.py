@@ -3,112 +3,284 @@
 🚀 One-click startup script for GraphRAG Test Generator
 """
 
+import hashlib
+import json
 import subprocess
 import sys
 import os
 import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+DEPS_STAMP = Path(".deps.sha256")  # SHA-256 of the requirements.txt and interpreter last installed into
+PIP_CACHE_DIR = ".pip-cache"  # Wheel cache kept next to the project for repeat installs
+COMPOSE_PARALLEL_LIMIT = str(max(2, (os.cpu_count() or 2) // 2))  # Default cap on containers compose starts at once
+STARTUP_STAMP = Path(".startup_stamp.json")  # Environment of the last start that reached the backend
+STARTUP_STAMP_MAX_AGE = 12 * 3600  # Seconds a stamp may skip the startup checks for
+
 def print_banner():
-    print("🤖 GraphRAG Test Case Generator")
-    print("=" * 50)
-    print("🚀 Starting up the system...")
-    print()
+    print("\n".join([
+        "🤖 GraphRAG Test Case Generator",
+        "=" * 50,
+        "🚀 Starting up the system...",
+        "",
+    ]))
 
 def check_requirements():
-    """Check if basic requirements are met"""
-    print("📋 Checking requirements...")
-    
-    # Check Python version
-    if sys.version_info < (3, 8):
-        print("❌ Python 3.8+ required")
-        return False
-    print("✅ Python version OK")
-    
-    # Check if .env file exists
-    if not Path(".env").exists():
-        print("❌ .env file not found!")
-        print("📝 Please create .env file with your API keys")
-        print("   See README.md for instructions")
-        return False
-    print("✅ .env file found")
+    """Check if basic requirements are met
     
-    # Check if Docker is available
+    Runs alongside the Qdrant start and pip install, so its report is collected
+    and written in one go instead of interleaving with their output.
+    """
+    out = ["📋 Checking requirements..."]
     try:
-        subprocess.run(["docker", "--version"], check=True, capture_output=True)
-        print("✅ Docker found")
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("⚠️  Docker not found - you'll need it for Qdrant")
+        # Check Python version
+        if sys.version_info < (3, 8):
+            out.append("❌ Python 3.8+ required")
+            return False
+        out.append("✅ Python version OK")
         
-    return True
+        # Check if .env file exists
+        if not Path(".env").exists():
+            out += [
+                "❌ .env file not found!",
+                "📝 Please create .env file with your API keys",
+                "   See README.md for instructions",
+            ]
+            return False
+        out.append("✅ .env file found")
+        
+        # Check if Docker is available
+        try:
+            subprocess.run(["docker", "--version"], check=True, capture_output=True)
+            out.append("✅ Docker found")
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            out.append("⚠️  Docker not found - you'll need it for Qdrant")
+            
+        return True
+    finally:
+        print("\n".join(out))
+
+def qdrant_container_id():
+    """Id of the qdrant_graphrag container if it is running, else None (one docker inspect call)"""
+    try:
+        result = subprocess.run(
+            ["docker", "inspect", "-f", "{{.Id}} {{.State.Running}}", "qdrant_graphrag"],
+            capture_output=True, text=True
+        )
+    except FileNotFoundError:
+        return None
+    container_id, _, running = result.stdout.strip().partition(" ")
+    return container_id if result.returncode == 0 and running == "true" else None
+
+def qdrant_container_running() -> bool:
+    """True if the qdrant_graphrag container is already up"""
+    return qdrant_container_id() is not None
+
+def qdrant_ready_url() -> str:
+    """Qdrant's readiness endpoint at QDRANT_HOST:QDRANT_PORT
+    
+    Read like config reads them (.env overriding the environment) without
+    importing config, which needs GEMINI_API_KEY; python-dotenv may not be
+    installed yet on a first run, so the environment alone is used then.
+    """
+    settings = dict(os.environ)
+    try:
+        from dotenv import dotenv_values
+        settings.update({k: v for k, v in dotenv_values(".env").items() if v is not None})
+    except ImportError:
+        pass
+    host = settings.get("QDRANT_HOST", "localhost")
+    port = settings.get("QDRANT_PORT", "6333")
+    return f"http://{host}:{port}/readyz"
+
+def _wait_qdrant(url: str, timeout: float = 30) -> bool:
+    """Poll Qdrant's readiness endpoint until it answers 200 or timeout seconds pass"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=0.5) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass  # Not listening yet (URLError and timeouts are OSErrors)
+        time.sleep(0.1)
+    return False
 
 def start_qdrant():
     """Start Qdrant using Docker Compose"""
-    print("🐳 Starting Qdrant database...")
+    if qdrant_container_running():
+        print("✅ Qdrant already running")
+        return True
+    
+    # Bounded so extra services in docker-compose.yml don't all start at once
+    # and starve each other; an exported COMPOSE_PARALLEL_LIMIT wins
+    env = os.environ.copy()
+    env.setdefault("COMPOSE_PARALLEL_LIMIT", COMPOSE_PARALLEL_LIMIT)
+    print(f"🐳 Starting Qdrant database (COMPOSE_PARALLEL_LIMIT={env['COMPOSE_PARALLEL_LIMIT']})...")
     try:
-        subprocess.run(["docker-compose", "up", "-d", "qdrant"], check=True)
+        subprocess.run(["docker-compose", "up", "-d", "qdrant"], check=True, env=env)
+        ready_url = qdrant_ready_url()
+        if not _wait_qdrant(ready_url):
+            print(f"❌ Qdrant container started but {ready_url} did not report ready within 30s")
+            return False
         print("✅ Qdrant started successfully")
-        time.sleep(3)  # Give Qdrant time to start
         return True
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to start Qdrant: {e}")
         print("💡 Make sure Docker Desktop is running")
         return False
 
-def install_dependencies():
-    """Install Python dependencies"""
+def requirements_sha() -> str:
+    """Digest of requirements.txt plus the interpreter, so a new venv or Python reinstalls"""
+    digest = hashlib.sha256(Path("requirements.txt").read_bytes())
+    digest.update(f"\0{sys.executable}\0{sys.version}".encode())
+    return digest.hexdigest()
+
+def install_dependencies(digest=None):
+    """Install Python dependencies (skipped when requirements.txt and the interpreter are unchanged since the last install)"""
+    digest = digest or requirements_sha()
+    if DEPS_STAMP.exists() and DEPS_STAMP.read_text().strip() == digest:
+        print("✅ Dependencies up to date (requirements.txt and Python unchanged)")
+        return True
+    
     print("📦 Installing Python dependencies...")
+    env = os.environ.copy()
+    env.setdefault("PIP_CACHE_DIR", PIP_CACHE_DIR)
     try:
-        subprocess.run([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"], check=True)
+        subprocess.run(
+            [sys.executable, "-m", "pip", "install", "--prefer-binary", "--no-input", "-r", "requirements.txt"],
+            check=True, env=env
+        )
+        DEPS_STAMP.write_text(digest)
         print("✅ Dependencies installed")
         return True
     except subprocess.CalledProcessError as e:
         print(f"❌ Failed to install dependencies: {e}")
         return False
 
-def start_backend():
-    """Start the FastAPI backend"""
-    print("⚡ Starting FastAPI backend...")
-    print("🌐 Backend will be available at: http://localhost:8000")
-    print("📚 API docs will be at: http://localhost:8000/docs")
-    print()
-    print("🔄 Starting server (press Ctrl+C to stop)...")
+def _current_stamp(digest: str, container_id: str) -> dict:
+    return {
+        "python_version": sys.version,
+        "python_executable": sys.executable,
+        "requirements_sha": digest,
+        "qdrant_container_id": container_id,
+    }
+
+def _load_stamp():
+    """The last good startup stamp, or None if missing or unreadable"""
+    try:
+        return json.loads(STARTUP_STAMP.read_text())
+    except (OSError, ValueError):
+        return None
+
+def _write_stamp(digest: str, container_id: str):
+    STARTUP_STAMP.write_text(json.dumps({**_current_stamp(digest, container_id), "timestamp": time.time()}))
+
+def _clear_stamp():
+    try:
+        STARTUP_STAMP.unlink()
+    except OSError:
+        pass
+
+def warm_restart(digest: str, container_id) -> bool:
+    """True if nothing the startup checks cover changed since the last good start:
+    same interpreter, same requirements.txt, same running Qdrant container, a .env
+    file, and a stamp younger than STARTUP_STAMP_MAX_AGE"""
+    stamp = _load_stamp()
+    if not stamp or container_id is None or not Path(".env").exists():
+        return False
+    if time.time() - stamp.get("timestamp", 0) > STARTUP_STAMP_MAX_AGE:
+        return False
+    return all(stamp.get(k) == v for k, v in _current_stamp(digest, container_id).items())
+
+def start_backend() -> bool:
+    """Start the FastAPI backend (False if the server exits with an error)"""
+    print("\n".join([
+        "⚡ Starting FastAPI backend...",
+        "🌐 Backend will be available at: http://localhost:8000",
+        "📚 API docs will be at: http://localhost:8000/docs",
+        "",
+        "🔄 Starting server (press Ctrl+C to stop)...",
+    ]))
+    
+    # The watchfiles reloader only needs the backend sources; changes under these
+    # folders never require a restart. Only folders that exist are passed: uvicorn
+    # resolves an existing folder itself but globs any other pattern, and globbing
+    # a missing absolute path raises NotImplementedError
+    reload_excludes = []
+    for folder in ("frontend", "documents", PIP_CACHE_DIR):
+        if Path(folder).is_dir():
+            reload_excludes += ["--reload-exclude", folder]
     
     try:
-        subprocess.run([
+        result = subprocess.run([
             sys.executable, "-m", "uvicorn", 
             "main:app", 
             "--host", "0.0.0.0", 
             "--port", "8000", 
-            "--reload"
+            "--reload",
+            "--reload-dir", ".",
+            *reload_excludes,
+            # uvloop has no Windows build; httptools does
+            "--loop", "asyncio" if sys.platform == "win32" else "uvloop",
+            "--http", "httptools"
         ])
     except KeyboardInterrupt:
         print("\n👋 Server stopped")
+        return True
+    return result.returncode == 0
 
 def main():
     """Main startup function"""
     print_banner()
     
-    if not check_requirements():
+    digest = requirements_sha()
+    if warm_restart(digest, qdrant_container_id()):
+        print("⚡ Nothing changed since the last successful start - skipping checks and installs\n")
+        if not start_backend():
+            _clear_stamp()
+        return
+    _clear_stamp()
+    
+    # The checks, the Qdrant container start and pip install don't depend on each
+    # other, so they run side by side: startup waits for the slowest, not the sum
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        requirements = pool.submit(check_requirements)
+        qdrant = pool.submit(start_qdrant)
+        dependencies = pool.submit(install_dependencies, digest)
+        requirements_ok, qdrant_ok, dependencies_ok = (
+            requirements.result(), qdrant.result(), dependencies.result()
+        )
+    
+    if not requirements_ok:
         print("\n❌ Requirements not met. Please check the issues above.")
         return
     
-    if not start_qdrant():
+    if not qdrant_ok:
         print("\n⚠️  Qdrant failed to start, but continuing anyway...")
     
-    if not install_dependencies():
+    if not dependencies_ok:
         print("\n❌ Failed to install dependencies")
         return
     
-    print("\n🎉 System ready! Starting backend...")
-    print("📝 To start the frontend:")
-    print("   1. Open a new terminal")
-    print("   2. cd frontend")
-    print("   3. npm install")
-    print("   4. npm start")
-    print()
+    print("\n".join([
+        "\n🎉 System ready! Starting backend...",
+        "📝 To start the frontend:",
+        "   1. Open a new terminal",
+        "   2. cd frontend",
+        "   3. npm install",
+        "   4. npm start",
+        "",
+    ]))
     
-    start_backend()
+    # Next time, an unchanged environment can go straight to the backend
+    container_id = qdrant_ok and qdrant_container_id()
+    if container_id:
+        _write_stamp(digest, container_id)
+    if not start_backend():
+        _clear_stamp()
 
 if __name__ == "__main__":
     main()
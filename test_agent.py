@@ -0,0 +1,56 @@
+"""
+LLM response parsing in agent
+"""
+import asyncio
+import importlib
+import orjson
+import pytest
+
+@pytest.fixture
+def agent(monkeypatch):
+    """The agent module; config requires a Gemini key to import, though none is used here"""
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    return importlib.import_module("agent")
+
+def test_extract_json_object_plain(agent):
+    text = '{"query": "login", "test_cases": []}'
+    assert agent._extract_json_object(text) == text
+
+def test_extract_json_object_surrounding_text(agent):
+    """Prose and trailing objects around the first object are dropped"""
+    text = 'Here you go:\n{"a": {"b": [1, 2]}}\nand {"c": 3}'
+    assert orjson.loads(agent._extract_json_object(text)) == {"a": {"b": [1, 2]}}
+
+def test_extract_json_object_braces_in_strings(agent):
+    """Braces and escaped quotes inside strings don't affect nesting"""
+    obj = {"title": "Handles } and { in \"quoted\" text", "steps": [{"data": "{}"}]}
+    text = "```json\n" + orjson.dumps(obj).decode() + "\n```"
+    assert orjson.loads(agent._extract_json_object(text)) == obj
+
+def test_extract_json_object_non_ascii(agent):
+    obj = {"summary": "Überprüfung – 検証 🚀"}
+    assert orjson.loads(agent._extract_json_object("x " + orjson.dumps(obj).decode())) == obj
+
+def test_extract_json_object_missing_or_truncated(agent):
+    assert agent._extract_json_object("no json here") is None
+    # Unbalanced output is returned whole for the repair path
+    assert agent._extract_json_object('prefix {"a": [1, 2') == '{"a": [1, 2'
+
+def test_generate_test_suites_bounded_and_ordered(agent, monkeypatch):
+    """At most `concurrency` generations run at once, and results follow input order"""
+    running = peak = 0
+
+    async def fake_generate(query, context):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Later queries finish first, so completion order differs from input order
+        await asyncio.sleep(0.001 * (20 - int(query)))
+        running -= 1
+        return agent.TestSuite(query=query, test_cases=[], total_count=0)
+
+    monkeypatch.setattr(agent, "generate_test_suite", fake_generate)
+    pairs = [(str(i), "context") for i in range(20)]
+    suites = asyncio.run(agent.generate_test_suites(pairs, concurrency=3))
+    assert [suite.query for suite in suites] == [query for query, _ in pairs]
+    assert peak == 3
@@ -0,0 +1,65 @@
+"""
+DocumentTracker cache persistence: log replay, compaction and torn log lines
+"""
+import os
+import pytest
+from document_tracker import DocumentTracker
+
+@pytest.fixture
+def folder(tmp_path):
+    """A documents folder with two small .docx-named files"""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.docx").write_bytes(b"first document")
+    (docs / "b.docx").write_bytes(b"second document")
+    return docs
+
+def _process(tracker: DocumentTracker, folder) -> dict:
+    """One ingestion pass: detect changes, then mark the new/modified files processed"""
+    changes = tracker.get_changed_documents(str(folder))
+    names = [os.path.basename(path) for path in changes["new"] + changes["modified"]]
+    tracker.mark_documents_processed(str(folder), names)
+    return changes
+
+def test_log_replay_restores_cache(tmp_path, folder):
+    """Changes appended to the log after the snapshot are replayed on load"""
+    cache_file = str(tmp_path / "cache.msgpack")
+    tracker = DocumentTracker(cache_file)
+    _process(tracker, folder)
+    assert os.path.exists(cache_file)
+    
+    # A modification and a deletion go to the log, not the snapshot
+    (folder / "a.docx").write_bytes(b"first document, edited")
+    (folder / "b.docx").unlink()
+    changes = _process(tracker, folder)
+    assert [os.path.basename(path) for path in changes["modified"]] == ["a.docx"]
+    assert os.path.exists(tracker.log_file)
+    
+    reloaded = DocumentTracker(cache_file)
+    assert reloaded.cache == tracker.cache
+    assert set(reloaded.cache["documents"]) == {"a.docx"}
+    assert _process(reloaded, folder)["unchanged"] == [str(folder / "a.docx")]
+
+def test_compaction_truncates_log(tmp_path, folder):
+    """compact() folds the log into the snapshot without losing entries"""
+    cache_file = str(tmp_path / "cache.msgpack")
+    tracker = DocumentTracker(cache_file)
+    _process(tracker, folder)
+    (folder / "a.docx").write_bytes(b"first document, edited")
+    _process(tracker, folder)
+    
+    tracker.compact()
+    assert not os.path.exists(tracker.log_file)
+    assert DocumentTracker(cache_file).cache == tracker.cache
+
+def test_torn_log_line_is_skipped(tmp_path, folder):
+    """A partial line left by an interrupted write doesn't lose the records before it"""
+    cache_file = str(tmp_path / "cache.msgpack")
+    tracker = DocumentTracker(cache_file)
+    _process(tracker, folder)
+    (folder / "a.docx").write_bytes(b"first document, edited")
+    _process(tracker, folder)
+    
+    with open(tracker.log_file, "ab") as f:
+        f.write(b'{"filename": "c.docx", "act')
+    assert DocumentTracker(cache_file).cache == tracker.cache
@@ -0,0 +1,18 @@
+"""
+docx_stream must read the same paragraphs as python-docx
+"""
+import glob
+import os
+import pytest
+from docx_stream import iter_paragraphs
+
+docx = pytest.importorskip("docx")
+
+def test_iter_paragraphs_matches_python_docx(doc_folder):
+    """(style_name, text) pairs equal python-docx's doc.paragraphs for every sample document"""
+    paths = sorted(glob.glob(os.path.join(doc_folder, "*.docx")))
+    if not paths:
+        pytest.skip("No .docx files in the document folder")
+    for path in paths:
+        expected = [(para.style.name, para.text) for para in docx.Document(path).paragraphs]
+        assert list(iter_paragraphs(path)) == expected, os.path.basename(path)
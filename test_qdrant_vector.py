@@ -0,0 +1,58 @@
+"""
+QdrantVectorStore search caching, against an in-memory (local mode) Qdrant
+"""
+import importlib
+import time
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+# Local mode searches exactly and warns that the HNSW search params are ignored
+pytestmark = pytest.mark.filterwarnings("ignore:Local mode performs exact")
+
+@pytest.fixture
+def qdrant_vector(monkeypatch):
+    """The qdrant_vector module; config requires a Gemini key to import, though none is used here"""
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    return importlib.import_module("qdrant_vector")
+
+@pytest.fixture
+def store(qdrant_vector, monkeypatch):
+    """A store over a local-mode collection of two points, with a 10 ms search cache TTL"""
+    monkeypatch.setattr(qdrant_vector, "SEARCH_CACHE_TTL", 0.01)
+    client = QdrantClient(":memory:")
+    client.create_collection("chunks", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert("chunks", points=[
+        PointStruct(id=i, vector=vector, payload={
+            "text": f"chunk {i}", "file_name": "a.docx", "section_title": "", "doc_type": "OTHER"
+        })
+        for i, vector in enumerate([[1, 0, 0, 0], [0, 1, 0, 0]])
+    ])
+    # Skip __init__, which connects to the configured server
+    store = qdrant_vector.QdrantVectorStore.__new__(qdrant_vector.QdrantVectorStore)
+    store.client = client
+    store.collection_name = "chunks"
+    store._search_cache = qdrant_vector.TTLCache(maxsize=16, ttl=qdrant_vector.SEARCH_CACHE_TTL)
+    store._clear_search_caches()
+    return store
+
+def _count_queries(store, monkeypatch) -> list:
+    calls = []
+    query_points = store.client.query_points
+    monkeypatch.setattr(store.client, "query_points", lambda *a, **kw: calls.append(1) or query_points(*a, **kw))
+    return calls
+
+def test_repeat_within_ttl_is_cached(store, monkeypatch):
+    calls = _count_queries(store, monkeypatch)
+    first = store.search_similar([1, 0, 0, 0], top_k=1, score_threshold=0.5)
+    assert store.search_similar([1, 0, 0, 0], top_k=1, score_threshold=0.5) == first
+    assert [chunk["text"] for chunk in first] == ["chunk 0"]
+    assert len(calls) == 1
+
+def test_expired_entry_reaches_server(store, monkeypatch):
+    """Neither the exact nor the semantic cache answers once SEARCH_CACHE_TTL has passed"""
+    calls = _count_queries(store, monkeypatch)
+    store.search_similar([1, 0, 0, 0], top_k=1, score_threshold=0.5)
+    time.sleep(0.05)
+    store.search_similar([1, 0, 0, 0], top_k=1, score_threshold=0.5)
+    assert len(calls) == 2
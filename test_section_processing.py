@@ -6,27 +6,20 @@ Demonstrates granular change detection and processing
 import sys
 import os
 from enhanced_ingestion import ingest_documents_sectioned
-from section_tracker import SectionTracker
+from section_tracker import get_tracker
 
-def test_section_processing():
+def test_section_processing(doc_folder, tracker):
     """Test the section-level document processing"""
     print("🧪 Testing Section-Level Document Processing")
     print("=" * 60)
     
-    doc_folder = "documents"
-    
-    if not os.path.exists(doc_folder):
-        print(f"❌ Document folder '{doc_folder}' not found!")
-        return
-    
     # Test 1: Initial processing (all sections should be "new")
     print("\\n📋 Test 1: Initial Section Processing")
     print("-" * 40)
     
-    tracker = SectionTracker()
     tracker.force_reprocess_all()  # Clear cache for clean test
     
-    result = ingest_documents_sectioned(doc_folder)
+    result = ingest_documents_sectioned(doc_folder, tracker=tracker)
     
     print(f"\\n📊 Results:")
     print(f"   📝 New chunks: {len(result['new_chunks'])}")
@@ -37,7 +30,7 @@ def test_section_processing():
     print("\\n📋 Test 2: No Changes Detection")
     print("-" * 40)
     
-    result = ingest_documents_sectioned(doc_folder)
+    result = ingest_documents_sectioned(doc_folder, tracker=tracker)
     
     print(f"\\n📊 Results:")
     print(f"   📝 New chunks: {len(result['new_chunks'])}")
@@ -74,5 +67,8 @@ def simulate_document_change():
     print("5. Minimal API calls and fast processing!")
 
 if __name__ == "__main__":
-    test_section_processing()
+    if not os.path.exists("documents"):
+        print("❌ Document folder 'documents' not found!")
+        sys.exit(1)
+    test_section_processing("documents", get_tracker())
     simulate_document_change()